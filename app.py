@@ -1,39 +1,190 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, make_response, current_app
+from flask import Flask, render_template, request, redirect, url_for, session, flash, make_response, g, has_app_context, \
+    Response, abort, stream_with_context, has_request_context, before_render_template, template_rendered, jsonify, \
+    send_file
+import abc
 import sqlite3
 import os
 import re
 import json
+import threading
+import hashlib
+import glob
+import secrets
+import shutil
+import tempfile
+import csv
+import io
+import atexit
+import sys
+import time
+import bisect
+import zipfile
+import gzip
+import base64
+import mimetypes
+import logging
+import click
 import pytz
+from collections import OrderedDict, deque, Counter
+from concurrent.futures import ThreadPoolExecutor, Future
 from datetime import datetime
-from werkzeug.utils import secure_filename
-from typing import Optional
+from werkzeug.security import safe_join, generate_password_hash, check_password_hash
+from flask.sessions import SessionInterface, SecureCookieSession
+from flask.json.tag import TaggedJSONSerializer
+from markupsafe import Markup, escape
+from jinja2 import FileSystemBytecodeCache
+from urllib.parse import quote
 from sqlite3 import Connection
 from functools import wraps
 from datetime import timedelta
-from typing import Optional, List, Dict, Tuple
+from typing import Optional, List, Dict, Tuple, Iterator
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # 未安裝 Pillow 時只保存原圖，不產生縮圖
+    Image = None
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # 未安裝 openpyxl 時只提供 CSV 匯出
+    Workbook = None
+
+try:
+    import brotli
+except ImportError:  # 未安裝 brotli 時只預先產生 gzip 版本，圖示字型也無法讀寫 woff2
+    brotli = None
+
+try:
+    from fontTools import subset as font_subset
+    # 圖示字型的 post 表有多餘位元組，讀取時的警告不影響子集結果
+    logging.getLogger('fontTools').setLevel(logging.ERROR)
+except ImportError:  # 未安裝 fonttools 時使用完整的圖示字型
+    font_subset = None
+
+try:
+    import fcntl
+except ImportError:  # Windows 沒有 fcntl，分段上傳改用只在單一行程內有效的鎖
+    fcntl = None
+
+try:
+    from rjsmin import jsmin
+except ImportError:  # 未安裝 rjsmin 時 JavaScript 只合併、不壓縮
+    jsmin = None
+
+try:
+    from rcssmin import cssmin
+except ImportError:  # 未安裝 rcssmin 時 CSS 只合併、不壓縮
+    cssmin = None
 
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
+app.config['DATABASE'] = 'database.db'
+# SQLite 連線調校：WAL 讓讀取不被寫入阻塞，busy timeout 讓寫入彼此排隊而非直接失敗
+app.config['DB_BUSY_TIMEOUT'] = 5.0
+app.config['DB_CACHE_SIZE_KB'] = 16384
+app.config['DB_MMAP_SIZE'] = 256 * 1024 * 1024
+# 公開頁面渲染結果快取的最大筆數
+app.config['PAGE_CACHE_SIZE'] = 256
+# 每隔幾秒最多查詢一次其他 worker 記錄的快取失效（本行程的失效立即生效）
+app.config['PAGE_CACHE_SYNC_INTERVAL'] = 1.0
+# 公告列表每頁筆數
+app.config['ANNOUNCEMENTS_PER_PAGE'] = 12
+# 首頁與公告列表使用的公開公告快照最多保留幾則，更早的頁面改為直接查詢資料庫
+app.config['ANNOUNCEMENT_FEED_SIZE'] = 1000
+# 公告搜尋每頁筆數
+app.config['SEARCH_RESULTS_PER_PAGE'] = 20
+# 後台表單提交記錄每頁筆數
+app.config['SUBMISSIONS_PER_PAGE'] = 100
+# 行程內快取的已解析表單定義數量上限
+app.config['FORM_CACHE_SIZE'] = 256
+# 表單提交寫入模式：'direct' 每筆直接寫入資料庫；'journal' 先寫入本機日誌，再由背景執行緒批次寫入
+app.config['SUBMISSION_INGEST_MODE'] = os.environ.get('SUBMISSION_INGEST_MODE', 'direct')
+app.config['SUBMISSION_JOURNAL_DIR'] = 'journal'
+app.config['SUBMISSION_BATCH_SIZE'] = 500
+app.config['SUBMISSION_FLUSH_INTERVAL'] = 0.05
+# 效能量測：/metrics 需要後台登入、METRICS_TOKEN（Authorization: Bearer <token>）或來源 IP 在允許清單內；
+# 放在反向代理後面時 IP 檢查要靠 wsgi.py 的 ProxyFix 才看得到真正的來源。
+# Server-Timing 標頭只回給已登入的管理員，SERVER_TIMING=1 時回給所有人（本機除錯用）。
+# 設定 PROFILE_SLOW_REQUEST_MS（毫秒）即啟用慢請求取樣
+app.config['METRICS_ALLOWED_IPS'] = ('127.0.0.1', '::1')
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+app.config['SERVER_TIMING'] = os.environ.get('SERVER_TIMING') == '1'
+app.config['PROFILE_SLOW_REQUEST_MS'] = (
+    float(os.environ['PROFILE_SLOW_REQUEST_MS']) if os.environ.get('PROFILE_SLOW_REQUEST_MS') else None
+)
+app.config['PROFILE_SAMPLE_INTERVAL'] = 0.005
+app.config['PROFILE_DIR'] = 'profiles'
+# 預先編譯的 Jinja 樣板位元組碼存放處，重新部署後 worker 可直接載入
+app.config['TEMPLATE_BYTECODE_CACHE_DIR'] = '.jinja_cache'
+# 帶有內容雜湊的靜態檔網址可以長期快取
+app.config['STATIC_IMMUTABLE_MAX_AGE'] = 365 * 24 * 60 * 60
+# 回應壓縮：文字類回應依 Accept-Encoding 以 brotli / gzip 壓縮；公開頁面以較高壓縮率壓縮一次，
+# 結果保留在記憶體（COMPRESS_CACHE_BYTES 為總大小上限），其餘回應使用較快的壓縮等級
+app.config['COMPRESS_MIMETYPES'] = (
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'application/json', 'application/javascript', 'image/svg+xml',
+)
+app.config['COMPRESS_MIN_SIZE'] = 512
+app.config['COMPRESS_LEVELS'] = {'br': 4, 'gzip': 6}
+app.config['COMPRESS_CACHED_LEVELS'] = {'br': 11, 'gzip': 9}
+app.config['COMPRESS_CACHE_BYTES'] = 32 * 1024 * 1024
+# 前端資源打包（flask build-assets）：輸出到 static/ 底下的目錄，檔名帶內容雜湊並附上 .gz / .br
+app.config['ASSET_DIST_DIR'] = 'dist'
+# 公開頁面預先渲染成靜態 HTML 的輸出目錄（flask build-static），由 nginx 直接提供
+app.config['STATIC_BUILD_DIR'] = os.environ.get('STATIC_BUILD_DIR', 'build')
+# 上傳圖片的縮圖：寬度、WebP 品質與背景處理的執行緒數
+app.config['IMAGE_VARIANT_FOLDER'] = 'static/uploads/variants'
+app.config['IMAGE_VARIANT_WIDTHS'] = (320, 640, 1280)
+app.config['IMAGE_VARIANT_QUALITY'] = 80
+# 圖片載入前顯示的模糊預覽（LQIP）：長邊像素數與 WebP 品質，以 data URI 內嵌在頁面
+app.config['IMAGE_PLACEHOLDER_SIZE'] = 16
+app.config['IMAGE_PLACEHOLDER_QUALITY'] = 50
+app.config['IMAGE_WORKERS'] = 2
+# 公告批次匯入：每個交易寫入的公告數與解壓縮圖片的執行緒數
+app.config['BULK_IMPORT_BATCH_SIZE'] = 5000
+app.config['BULK_IMPORT_WORKERS'] = 4
+# 分段（可續傳）上傳：未完成的檔案放在 static 之外，逾期未完成或未使用的上傳工作會被清除
+app.config['UPLOAD_PARTS_FOLDER'] = 'upload_parts'
+app.config['UPLOAD_CHUNK_SIZE'] = 1024 * 1024
+app.config['UPLOAD_MAX_SIZE'] = 512 * 1024 * 1024
+app.config['UPLOAD_SESSION_TTL'] = 24 * 60 * 60
+# 密碼雜湊的 KDF 與參數（werkzeug 格式），調整後舊雜湊會在下次登入成功時自動換成新參數
+app.config['PASSWORD_HASH_METHOD'] = 'scrypt:32768:8:1'
+# 登入嘗試的 token bucket：(容量, 補滿所需秒數)，分別以來源 IP 與帳號計算
+app.config['LOGIN_RATE_PER_IP'] = (10, 60)
+app.config['LOGIN_RATE_PER_ACCOUNT'] = (5, 300)
+app.config['LOGIN_RATE_MAX_KEYS'] = 10000
 SECRET_KEY = 'a4c78f3ea9cc4f74bfb15efad9b012ee2342abcdefff1234'
 app.secret_key = SECRET_KEY
 app.permanent_session_lifetime = timedelta(minutes=10)
+# 伺服器端 session：每次有活動就延長期限（最多每 SESSION_REFRESH_INTERVAL 秒寫一次資料庫）；
+# 行程內快取的項目超過 SESSION_CACHE_TTL 秒會重新向資料庫確認，其他 worker 的撤銷最晚在這段時間後生效
+app.config['SESSION_CACHE_SIZE'] = 1024
+app.config['SESSION_CACHE_TTL'] = 5
+app.config['SESSION_REFRESH_INTERVAL'] = 60
 
 
 def init_db() -> None:
     """
     初始化資料庫，若不存在則建立 announcements 與 images 資料表。
     """
-    if not os.path.exists('database.db'):
+    if not os.path.exists(app.config['DATABASE']):
         try:
-            conn = sqlite3.connect('database.db')
+            conn = sqlite3.connect(app.config['DATABASE'])
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS announcements (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     title TEXT NOT NULL,
                     content TEXT NOT NULL,
                     image TEXT,
-                    timestamp TEXT NOT NULL
+                    timestamp TEXT NOT NULL,
+                    excerpt TEXT,
+                    image_variants TEXT,
+                    publish_at TEXT,
+                    expire_at TEXT,
+                    image_width INTEGER,
+                    image_height INTEGER,
+                    image_placeholder TEXT
                 );
             ''')
             conn.execute('''
@@ -42,6 +193,10 @@ def init_db() -> None:
                     announcement_id INTEGER NOT NULL,
                     filename TEXT NOT NULL,
                     is_cover INTEGER DEFAULT 0,
+                    variants TEXT,
+                    width INTEGER,
+                    height INTEGER,
+                    placeholder TEXT,
                     FOREIGN KEY (announcement_id) REFERENCES announcements (id)
                 );
             ''')
@@ -66,24 +221,909 @@ def init_db() -> None:
             conn.execute('''
                 INSERT OR IGNORE INTO members (username, account, password)
                 VALUES (?, ?, ?)
-            ''', ('admin', 'admin', 'admin'))
+            ''', ('admin', 'admin', hash_password('admin')))
 
             conn.commit()
         except sqlite3.Error as e:
             print(f"資料庫錯誤: {e}")
         finally:
             conn.close()
+    migrate_db()
 
 
-def get_db_connection() -> Connection:
+# 每次修改 migrate_db 的內容都要遞增，已是最新版本的資料庫會直接略過整個遷移流程
+SCHEMA_VERSION = 8
+
+
+def migrate_db() -> None:
+    """
+    為既有資料庫補上新版的欄位與索引，可重複執行。
+    以 PRAGMA user_version 記錄版本；多個行程同時啟動時只有第一個取得寫入鎖的行程會執行遷移。
+    """
+    conn = get_db_connection()
+    if conn.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION:
+        return
+
+    with conn:
+        conn.execute('BEGIN IMMEDIATE')
+        if conn.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION:
+            return
+        if _add_column_if_missing(conn, 'announcements', 'excerpt', 'TEXT'):
+            rows = conn.execute('SELECT id, content FROM announcements').fetchall()
+            conn.executemany(
+                'UPDATE announcements SET excerpt = ? WHERE id = ?',
+                [(make_excerpt(row['content']), row['id']) for row in rows]
+            )
+        _add_column_if_missing(conn, 'announcements', 'image_variants', 'TEXT')
+        _add_column_if_missing(conn, 'images', 'variants', 'TEXT')
+        _add_column_if_missing(conn, 'announcements', 'publish_at', 'TEXT')
+        _add_column_if_missing(conn, 'announcements', 'expire_at', 'TEXT')
+        for table, prefix in (('announcements', 'image_'), ('images', '')):
+            _add_column_if_missing(conn, table, f'{prefix}width', 'INTEGER')
+            _add_column_if_missing(conn, table, f'{prefix}height', 'INTEGER')
+            _add_column_if_missing(conn, table, f'{prefix}placeholder', 'TEXT')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS upload_blobs (
+                filename TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                refcount INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_images_announcement_id ON images (announcement_id)')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS form_submissions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                form_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                email TEXT NOT NULL,
+                phone TEXT NOT NULL,
+                fields JSON NOT NULL,
+                timestamp TEXT NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_form_submissions_form_id ON form_submissions (form_id, id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_form_submissions_timestamp ON form_submissions (timestamp)')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+                journal TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS page_cache_invalidations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                pid INTEGER NOT NULL,
+                endpoint TEXT NOT NULL,
+                view_args TEXT NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS upload_sessions (
+                id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                received INTEGER NOT NULL DEFAULT 0,
+                blob TEXT,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS admin_sessions (
+                sid TEXT PRIMARY KEY,
+                iid INTEGER,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_admin_sessions_iid ON admin_sessions (iid)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_admin_sessions_expires_at ON admin_sessions (expires_at)')
+        _migrate_per_form_submission_tables(conn)
+        _ensure_submission_aggregates(conn)
+        _ensure_announcement_search_index(conn)
+        _hash_plaintext_passwords(conn)
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+
+def _ensure_announcement_search_index(conn: Connection) -> None:
+    """
+    建立公告全文檢索用的 FTS5 外部內容表與同步觸發器；首次建立時重建索引。
+    中文沒有空白斷詞，因此使用 trigram 分詞器；舊版 SQLite 不支援時退回 unicode61。
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'announcements_fts'"
+    ).fetchone()
+    if exists:
+        return
+
+    for tokenizer in ('trigram', 'unicode61'):
+        try:
+            conn.execute(f'''
+                CREATE VIRTUAL TABLE announcements_fts USING fts5(
+                    title, content, content='announcements', content_rowid='id', tokenize='{tokenizer}'
+                )
+            ''')
+            break
+        except sqlite3.OperationalError:
+            continue
+    else:
+        print("資料庫不支援 FTS5，公告搜尋將改用 LIKE 查詢")
+        return
+
+    # 不使用 executescript：它會先 COMMIT，破壞 migrate_db 的交易
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS announcements_fts_insert AFTER INSERT ON announcements BEGIN
+            INSERT INTO announcements_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS announcements_fts_delete AFTER DELETE ON announcements BEGIN
+            INSERT INTO announcements_fts (announcements_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS announcements_fts_update AFTER UPDATE OF title, content ON announcements BEGIN
+            INSERT INTO announcements_fts (announcements_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO announcements_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+    ''')
+    conn.execute("INSERT INTO announcements_fts (announcements_fts) VALUES ('rebuild')")
+
+
+# 統計用的欄位值只保留前段文字，避免自由填寫的長文字佔滿統計表
+SUBMISSION_VALUE_MAX_LENGTH = 100
+
+
+def _ensure_submission_aggregates(conn: Connection) -> None:
+    """
+    建立表單提交的統計表：每小時的提交數與各自訂欄位的值分布，由觸發器隨 form_submissions
+    的新增與刪除同步更新，查詢成本只和統計筆數有關。首次建立時以既有資料回填。
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'submission_hourly_counts'"
+    ).fetchone()
+    if exists:
+        return
+
+    conn.execute('''
+        CREATE TABLE submission_hourly_counts (
+            form_id INTEGER NOT NULL,
+            hour TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (form_id, hour)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE submission_value_counts (
+            form_id INTEGER NOT NULL,
+            field TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (form_id, field, value)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        INSERT INTO submission_hourly_counts (form_id, hour, count)
+        SELECT form_id, substr(timestamp, 1, 13), count(*) FROM form_submissions GROUP BY 1, 2
+    ''')
+    conn.execute(f'''
+        INSERT INTO submission_value_counts (form_id, field, value, count)
+        SELECT s.form_id, f.key, substr(f.value, 1, {SUBMISSION_VALUE_MAX_LENGTH}), count(*)
+        FROM form_submissions AS s, json_each(s.fields) AS f GROUP BY 1, 2, 3
+    ''')
+
+    # 不使用 executescript：它會先 COMMIT，破壞 migrate_db 的交易
+    # 「WHERE true」是 INSERT ... SELECT 搭配 ON CONFLICT 時 SQLite 要求的寫法
+    conn.execute(f'''
+        CREATE TRIGGER submission_aggregates_insert AFTER INSERT ON form_submissions BEGIN
+            INSERT INTO submission_hourly_counts (form_id, hour, count)
+            VALUES (new.form_id, substr(new.timestamp, 1, 13), 1)
+            ON CONFLICT (form_id, hour) DO UPDATE SET count = count + 1;
+            INSERT INTO submission_value_counts (form_id, field, value, count)
+            SELECT new.form_id, key, substr(value, 1, {SUBMISSION_VALUE_MAX_LENGTH}), 1
+            FROM json_each(new.fields) WHERE true
+            ON CONFLICT (form_id, field, value) DO UPDATE SET count = count + 1;
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER submission_aggregates_delete AFTER DELETE ON form_submissions BEGIN
+            UPDATE submission_hourly_counts SET count = count - 1
+            WHERE form_id = old.form_id AND hour = substr(old.timestamp, 1, 13);
+            DELETE FROM submission_hourly_counts
+            WHERE form_id = old.form_id AND hour = substr(old.timestamp, 1, 13) AND count <= 0;
+            UPDATE submission_value_counts SET count = count - 1
+            WHERE form_id = old.form_id AND (field, value) IN (
+                SELECT key, substr(value, 1, {SUBMISSION_VALUE_MAX_LENGTH}) FROM json_each(old.fields)
+            );
+            DELETE FROM submission_value_counts
+            WHERE form_id = old.form_id AND count <= 0 AND (field, value) IN (
+                SELECT key, substr(value, 1, {SUBMISSION_VALUE_MAX_LENGTH}) FROM json_each(old.fields)
+            );
+        END
+    ''')
+
+
+def _migrate_per_form_submission_tables(conn: Connection) -> None:
+    """
+    將舊版每張表單一個的 form_submissions_N 資料表搬進 form_submissions，搬完後刪除舊表。
+    """
+    legacy_tables = [
+        row['name'] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB 'form_submissions_[0-9]*'"
+        )
+    ]
+    for table in legacy_tables:
+        form_id = int(table.rsplit('_', 1)[1])
+        form = conn.execute('SELECT custom_fields FROM forms WHERE id = ?', (form_id,)).fetchone()
+        if form:
+            custom_names = [f['original_name'] for f in json.loads(form['custom_fields'])]
+            existing = {row['name'] for row in conn.execute(f'PRAGMA table_info({table})')}
+            conn.executemany(
+                'INSERT INTO form_submissions (form_id, name, email, phone, fields, timestamp) VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    (
+                        form_id, row['name'], row['email'], row['phone'],
+                        json.dumps({name: row[name] or '' for name in custom_names if name in existing}, ensure_ascii=False),
+                        row['timestamp'],
+                    )
+                    for row in conn.execute(f'SELECT * FROM {table} ORDER BY id').fetchall()
+                )
+            )
+            conn.execute('UPDATE forms SET table_name = ? WHERE id = ?', ('form_submissions', form_id))
+        conn.execute(f'DROP TABLE {table}')
+
+
+def _hash_plaintext_passwords(conn: Connection) -> None:
+    """把舊版以明文儲存的管理員密碼換成雜湊。"""
+    rows = conn.execute('SELECT iid, password FROM members').fetchall()
+    conn.executemany(
+        'UPDATE members SET password = ? WHERE iid = ?',
+        [(hash_password(row['password']), row['iid']) for row in rows if not is_password_hash(row['password'])]
+    )
+
+
+def _add_column_if_missing(conn: Connection, table: str, column: str, decl: str) -> bool:
+    """欄位不存在時新增，回傳是否有新增。"""
+    columns = {row['name'] for row in conn.execute(f'PRAGMA table_info({table})')}
+    if column in columns:
+        return False
+    conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {decl}')
+    return True
+
+
+class MetricsRegistry:
+    """
+    行程內的 Prometheus 風格指標（counter 與 histogram），由 /metrics 輸出文字格式。
+    多個 worker 行程時每個行程各自計數。
+    """
+
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._histograms: Dict[str, Dict[tuple, list]] = {}
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self._help[name] = ('histogram', help_text)
+        self._buckets[name] = buckets
+        self._histograms[name] = {}
+
+    def counter(self, name: str, help_text: str) -> None:
+        self._help[name] = ('counter', help_text)
+        self._counters[name] = {}
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        buckets = self._buckets[name]
+        with self._lock:
+            series = self._histograms[name].get(key)
+            if series is None:
+                series = self._histograms[name][key] = [[0] * len(buckets), 0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._counters[name][key] = self._counters[name].get(key, 0) + amount
+
+    def timed(self, name: str):
+        """裝飾器：把函式執行時間記錄到指定的 histogram。"""
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return f(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start)
+            return decorated_function
+        return decorator
+
+    @staticmethod
+    def _labels(key: tuple, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = [*key, *extra]
+        if not pairs:
+            return ''
+        body = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs)
+        return '{' + body + '}'
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in self._help.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                if kind == 'counter':
+                    for key, value in self._counters[name].items():
+                        lines.append(f'{name}{self._labels(key)} {value}')
+                    continue
+                for key, (counts, total, count) in self._histograms[name].items():
+                    for bound, bucket_count in zip(self._buckets[name], counts):
+                        lines.append(f'{name}_bucket{self._labels(key, (("le", bound),))} {bucket_count}')
+                    lines.append(f'{name}_bucket{self._labels(key, (("le", "+Inf"),))} {count}')
+                    lines.append(f'{name}_sum{self._labels(key)} {total}')
+                    lines.append(f'{name}_count{self._labels(key)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+metrics.histogram('http_request_duration_seconds', '每個路由的請求處理時間')
+metrics.histogram('sql_queries_per_request', '每個請求執行的 SQL 數量', (1, 2, 3, 5, 10, 20, 50, 100))
+metrics.histogram('sql_query_duration_seconds', '單一 SQL 的執行時間', (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0))
+metrics.histogram('template_render_seconds', 'Jinja 樣板渲染時間')
+metrics.histogram('upload_save_seconds', '上傳檔案寫入磁碟的時間')
+metrics.histogram('upload_chunk_seconds', '分段上傳每一段寫入磁碟的時間')
+metrics.counter('slow_request_profiles_total', '已輸出的慢請求取樣檔數量')
+metrics.counter('login_rate_limited_total', '被限流拒絕的登入嘗試次數')
+metrics.histogram('response_compress_seconds', '回應壓縮時間（快取命中時不計）',
+                  (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1))
+
+
+def _record_sql(duration: float) -> None:
+    metrics.observe('sql_query_duration_seconds', duration)
+    if has_request_context() and 'sql_count' in g:
+        g.sql_count += 1
+        g.sql_time += duration
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """記錄每次 execute 時間的游標。"""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_sql(time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_sql(time.perf_counter() - start)
+
+    def executescript(self, sql_script):
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            _record_sql(time.perf_counter() - start)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """所有語句都經過 InstrumentedCursor 的連線。"""
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or InstrumentedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+class RequestProfiler:
+    """
+    慢請求取樣器：背景執行緒定期擷取正在處理請求的執行緒堆疊，
+    請求結束時若超過門檻就輸出 flame graph 可用的 folded stacks 檔。
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._active: Dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def begin(self) -> None:
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._thread.start()
+
+    def end(self) -> Counter:
+        with self._lock:
+            return self._active.pop(threading.get_ident(), Counter())
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, stacks in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        stacks[self._fold(frame)] += 1
+
+    @staticmethod
+    def _fold(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+
+request_profiler = RequestProfiler(app.config['PROFILE_SAMPLE_INTERVAL'])
+
+
+@app.before_request
+def start_request_timer() -> None:
+    g.request_start = time.perf_counter()
+    g.sql_count = 0
+    g.sql_time = 0.0
+    if app.config['PROFILE_SLOW_REQUEST_MS'] is not None:
+        request_profiler.begin()
+
+
+def server_timing_allowed() -> bool:
+    """
+    開啟 SERVER_TIMING 或已登入的管理員才回傳 Server-Timing。讀取 session 會讓回應加上 Vary: Cookie，
+    所以公開頁面與沒有 session cookie 的請求都不碰 session，共用快取才能儲存這些頁面。
+    """
+    if app.config['SERVER_TIMING']:
+        return True
+    if g.get('cache_policy') == 'public':
+        return False
+    if not request.cookies.get(app.session_interface.get_cookie_name(app)):
+        return False
+    return bool(session.get('logged_in'))
+
+
+@app.after_request
+def record_request_metrics(response):
+    """記錄請求時間與 SQL 統計；管理員（或開啟 SERVER_TIMING 時）另以 Server-Timing 標頭回傳給瀏覽器開發工具。"""
+    if 'request_start' not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_start
+    endpoint = request.endpoint or 'unknown'
+    metrics.observe('http_request_duration_seconds', elapsed,
+                    endpoint=endpoint, method=request.method, status=response.status_code)
+    metrics.observe('sql_queries_per_request', g.sql_count, endpoint=endpoint)
+    if server_timing_allowed():
+        response.headers['Server-Timing'] = (
+            f'db;dur={g.sql_time * 1000:.2f};desc="{g.sql_count} queries", total;dur={elapsed * 1000:.2f}'
+        )
+
+    if app.config['PROFILE_SLOW_REQUEST_MS'] is not None:
+        stacks = request_profiler.end()
+        if stacks and elapsed * 1000 >= app.config['PROFILE_SLOW_REQUEST_MS']:
+            _dump_profile(endpoint, elapsed, stacks)
+    return response
+
+
+def _dump_profile(endpoint: str, elapsed: float, stacks: Counter) -> None:
+    os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+    name = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{endpoint}-{int(elapsed * 1000)}ms.folded"
+    with open(os.path.join(app.config['PROFILE_DIR'], name), 'w', encoding='utf-8') as f:
+        for stack, count in stacks.most_common():
+            f.write(f'{stack} {count}\n')
+    metrics.inc('slow_request_profiles_total', endpoint=endpoint)
+
+
+@before_render_template.connect_via(app)
+def _start_template_timer(sender, template, context, **extra) -> None:
+    g.setdefault('template_starts', []).append(time.perf_counter())
+
+
+@template_rendered.connect_via(app)
+def _record_template_time(sender, template, context, **extra) -> None:
+    starts = g.get('template_starts')
+    if starts:
+        metrics.observe('template_render_seconds', time.perf_counter() - starts.pop(),
+                        template=template.name or 'string')
+
+
+_db_local = threading.local()
+_inherited_connections: List[Connection] = []
+
+
+def _open_db_connection() -> Connection:
     """
-    建立並回傳資料庫連線。
+    開啟一條新的資料庫連線並套用效能相關的 PRAGMA。
     """
-    conn = sqlite3.connect('database.db')
+    conn = sqlite3.connect(
+        app.config['DATABASE'], timeout=app.config['DB_BUSY_TIMEOUT'], factory=InstrumentedConnection
+    )
     conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute(f"PRAGMA cache_size = -{int(app.config['DB_CACHE_SIZE_KB'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(app.config['DB_MMAP_SIZE'])}")
+    conn.execute('PRAGMA temp_store = MEMORY')
     return conn
 
 
+def get_db_connection() -> Connection:
+    """
+    取得目前執行緒的資料庫連線。
+
+    每個執行緒只開啟一次連線並重複使用；在 app context 內同一個請求拿到的都是同一條連線，
+    請求結束時由 close_db_connection 收尾。呼叫端不需要（也不應該）自行 close。
+    """
+    if has_app_context() and 'db' in g:
+        return g.db
+
+    conn = getattr(_db_local, 'conn', None)
+    if conn is not None and getattr(_db_local, 'pid', None) != os.getpid():
+        # fork 之前開啟的連線不能在子行程使用（連 close 都不行），只保留參考避免被回收
+        _inherited_connections.append(conn)
+        conn = None
+    if conn is None or getattr(_db_local, 'path', None) != app.config['DATABASE']:
+        if conn is not None:
+            conn.close()
+        conn = _open_db_connection()
+        _db_local.conn = conn
+        _db_local.path = app.config['DATABASE']
+        _db_local.pid = os.getpid()
+
+    if has_app_context():
+        g.db = conn
+    return conn
+
+
+def discard_thread_connection() -> None:
+    """關閉目前執行緒重複使用的連線，下次 get_db_connection 會重新開啟。"""
+    conn = getattr(_db_local, 'conn', None)
+    if conn is not None and getattr(_db_local, 'pid', None) == os.getpid():
+        conn.close()
+    _db_local.conn = None
+
+
+@app.teardown_appcontext
+def close_db_connection(exception: Optional[BaseException]) -> None:
+    """
+    請求結束時將未完成的交易回滾，讓連線以乾淨狀態留給同執行緒的下一個請求。
+    """
+    conn = g.pop('db', None)
+    if conn is not None and conn.in_transaction:
+        conn.rollback()
+
+
+def hash_password(password: str) -> str:
+    return generate_password_hash(password, method=app.config['PASSWORD_HASH_METHOD'])
+
+
+def is_password_hash(value: str) -> bool:
+    return value.startswith(('scrypt:', 'pbkdf2:'))
+
+
+# 帳號不存在時也做一次同樣成本的驗證，避免從回應時間判斷帳號是否存在
+_DUMMY_PASSWORD_HASH: Optional[str] = None
+
+
+def verify_member_password(conn: Connection, account: str, password: str) -> Optional[sqlite3.Row]:
+    """
+    驗證帳號密碼，成功時回傳會員資料列，失敗回傳 None。
+    儲存的雜湊參數與 PASSWORD_HASH_METHOD 不同時，順便以新參數重新雜湊。
+    """
+    global _DUMMY_PASSWORD_HASH
+    row = conn.execute('SELECT iid, username, password FROM members WHERE account = ?', (account,)).fetchone()
+    if row is None:
+        if _DUMMY_PASSWORD_HASH is None:
+            _DUMMY_PASSWORD_HASH = hash_password(secrets.token_hex(16))
+        check_password_hash(_DUMMY_PASSWORD_HASH, password)
+        return None
+    if not check_password_hash(row['password'], password):
+        return None
+    if not row['password'].startswith(app.config['PASSWORD_HASH_METHOD'] + '$'):
+        with conn:
+            conn.execute('UPDATE members SET password = ? WHERE iid = ?', (hash_password(password), row['iid']))
+    return row
+
+
+class TokenBucketLimiter:
+    """
+    以 token bucket 限制每個鍵（IP、帳號）的請求頻率：每次請求消耗一個 token，
+    token 依固定速率補充，最多累積到 capacity。只記錄最近使用的 max_keys 個鍵。
+    狀態存在行程記憶體內，多個 worker 時實際上限是 worker 數乘以設定值。
+    """
+
+    def __init__(self, capacity: int, period: float, max_keys: int):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.max_keys = max_keys
+        self._buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str) -> float:
+        """消耗一個 token，成功回傳 0，否則回傳需要等待的秒數。"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+login_ip_limiter = TokenBucketLimiter(*app.config['LOGIN_RATE_PER_IP'], app.config['LOGIN_RATE_MAX_KEYS'])
+login_account_limiter = TokenBucketLimiter(*app.config['LOGIN_RATE_PER_ACCOUNT'], app.config['LOGIN_RATE_MAX_KEYS'])
+
+
+class SessionStore(abc.ABC):
+    """
+    伺服器端 session 的儲存後端。資料以序列化後的字串存放，期限是 time.time() 的秒數。
+    沒有實作全部抽象方法的後端在建立實例時就會失敗。
+    """
+
+    @abc.abstractmethod
+    def load(self, sid: str) -> Optional[Tuple[str, Optional[int], float]]:
+        """回傳 (資料, 管理員 iid, 到期時間)；不存在或已過期時回傳 None。"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def save(self, sid: str, payload: str, iid: Optional[int], expires_at: float) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def touch(self, sid: str, expires_at: float) -> None:
+        """只延長期限，不改資料。"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete(self, sid: str) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def revoke_member(self, iid: int, keep_sid: Optional[str] = None) -> int:
+        """刪除某位管理員的所有 session（可保留目前這一個），回傳刪除筆數。"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def purge_expired(self) -> int:
+        raise NotImplementedError
+
+
+class SQLiteSessionStore(SessionStore):
+    """以網站資料庫的 admin_sessions 資料表存放 session，不需要額外的服務。"""
+
+    # 每新增這麼多筆 session 就順便清除過期的資料列
+    PURGE_EVERY = 100
+
+    def __init__(self):
+        self._inserts = 0
+
+    def load(self, sid: str) -> Optional[Tuple[str, Optional[int], float]]:
+        row = get_db_connection().execute(
+            'SELECT data, iid, expires_at FROM admin_sessions WHERE sid = ? AND expires_at > ?', (sid, time.time())
+        ).fetchone()
+        return (row['data'], row['iid'], row['expires_at']) if row else None
+
+    def save(self, sid: str, payload: str, iid: Optional[int], expires_at: float) -> None:
+        with get_db_connection() as conn:
+            conn.execute('''
+                INSERT INTO admin_sessions (sid, iid, data, expires_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(sid) DO UPDATE SET iid = excluded.iid, data = excluded.data, expires_at = excluded.expires_at
+            ''', (sid, iid, payload, expires_at))
+        self._inserts += 1
+        if self._inserts % self.PURGE_EVERY == 0:
+            self.purge_expired()
+
+    def touch(self, sid: str, expires_at: float) -> None:
+        with get_db_connection() as conn:
+            conn.execute('UPDATE admin_sessions SET expires_at = ? WHERE sid = ?', (expires_at, sid))
+
+    def delete(self, sid: str) -> None:
+        with get_db_connection() as conn:
+            conn.execute('DELETE FROM admin_sessions WHERE sid = ?', (sid,))
+
+    def revoke_member(self, iid: int, keep_sid: Optional[str] = None) -> int:
+        with get_db_connection() as conn:
+            return conn.execute(
+                'DELETE FROM admin_sessions WHERE iid = ? AND sid != ?', (iid, keep_sid or '')
+            ).rowcount
+
+    def purge_expired(self) -> int:
+        with get_db_connection() as conn:
+            return conn.execute('DELETE FROM admin_sessions WHERE expires_at <= ?', (time.time(),)).rowcount
+
+
+class CachedSessionStore(SessionStore):
+    """
+    在任一後端之前加上行程內 LRU 快取，大多數請求不必查詢後端。
+    快取項目超過 ttl 秒後重新向後端確認，讓其他行程的撤銷也會生效。
+    查無資料的 sid 也記住 ttl 秒（另外一份 LRU，不會擠掉有效的 session），重複送來的假 sid 不再查詢後端。
+    """
+
+    def __init__(self, backend: SessionStore, max_entries: int, ttl: float):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # sid -> (資料, 管理員 iid, 到期時間, 上次向後端確認的時間)
+        self._entries: 'OrderedDict[str, Tuple[str, Optional[int], float, float]]' = OrderedDict()
+        # 查無資料的 sid -> 向後端確認的時間
+        self._misses: 'OrderedDict[str, float]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _put(self, sid: str, payload: str, iid: Optional[int], expires_at: float) -> None:
+        with self._lock:
+            self._misses.pop(sid, None)
+            self._entries[sid] = (payload, iid, expires_at, time.monotonic())
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def load(self, sid: str) -> Optional[Tuple[str, Optional[int], float]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is not None:
+                self._entries.move_to_end(sid)
+            elif now - self._misses.get(sid, -self.ttl) < self.ttl:
+                return None
+        if entry is not None and now - entry[3] < self.ttl:
+            return entry[:3] if entry[2] > time.time() else None
+
+        loaded = self.backend.load(sid)
+        if loaded is None:
+            with self._lock:
+                self._entries.pop(sid, None)
+                self._misses[sid] = now
+                self._misses.move_to_end(sid)
+                while len(self._misses) > self.max_entries:
+                    self._misses.popitem(last=False)
+            return None
+        self._put(sid, *loaded)
+        return loaded
+
+    def save(self, sid: str, payload: str, iid: Optional[int], expires_at: float) -> None:
+        self.backend.save(sid, payload, iid, expires_at)
+        self._put(sid, payload, iid, expires_at)
+
+    def touch(self, sid: str, expires_at: float) -> None:
+        self.backend.touch(sid, expires_at)
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is not None:
+                self._entries[sid] = (entry[0], entry[1], expires_at, entry[3])
+
+    def delete(self, sid: str) -> None:
+        self.backend.delete(sid)
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    def revoke_member(self, iid: int, keep_sid: Optional[str] = None) -> int:
+        count = self.backend.revoke_member(iid, keep_sid)
+        with self._lock:
+            for sid in [sid for sid, entry in self._entries.items() if entry[1] == iid and sid != keep_sid]:
+                del self._entries[sid]
+        return count
+
+    def purge_expired(self) -> int:
+        return self.backend.purge_expired()
+
+
+class ServerSideSession(SecureCookieSession):
+    """只在 cookie 中存放隨機 sid 的 session，資料放在 SessionStore。"""
+
+    def __init__(self, initial=None, sid: Optional[str] = None, expires_at: float = 0.0):
+        super().__init__(initial)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.rotate = False
+
+    def regenerate(self) -> None:
+        """登入等權限變更時換發新的 sid，避免 session fixation。"""
+        self.rotate = True
+        self.modified = True
+
+
+SESSION_ID_RE = re.compile(r'[A-Za-z0-9_-]{43}')
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Flask 的 session 介面：cookie 只存 sid，資料存在 store，期限隨每次活動往後延長。
+    """
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store: SessionStore):
+        self.store = store
+
+    def open_session(self, app: Flask, request) -> ServerSideSession:
+        sid = request.cookies.get(self.get_cookie_name(app))
+        # 不是 secrets.token_urlsafe(32) 產生的格式就不必查詢 store
+        if not sid or not SESSION_ID_RE.fullmatch(sid):
+            return ServerSideSession()
+        ensure_started()
+        loaded = self.store.load(sid)
+        if loaded is None:
+            return ServerSideSession()
+        return ServerSideSession(self.serializer.loads(loaded[0]), sid=sid, expires_at=loaded[2])
+
+    def save_session(self, app: Flask, session: ServerSideSession, response) -> None:
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if not session:
+            if session.modified and session.sid:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+                response.vary.add('Cookie')
+            return
+
+        now = time.time()
+        expires_at = now + app.permanent_session_lifetime.total_seconds()
+        if session.modified or not session.sid:
+            if session.rotate and session.sid:
+                self.store.delete(session.sid)
+                session.sid = None
+            session.sid = session.sid or secrets.token_urlsafe(32)
+            self.store.save(session.sid, self.serializer.dumps(dict(session)), dict.get(session, 'iid'), expires_at)
+        elif expires_at - session.expires_at >= app.config['SESSION_REFRESH_INTERVAL']:
+            self.store.touch(session.sid, expires_at)
+        else:
+            return
+
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+        response.vary.add('Cookie')
+
+
+session_store = CachedSessionStore(
+    SQLiteSessionStore(), app.config['SESSION_CACHE_SIZE'], app.config['SESSION_CACHE_TTL']
+)
+app.session_interface = ServerSideSessionInterface(session_store)
+
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -94,6 +1134,1225 @@ def login_required(f):
     return decorated_function
 
 
+class PageCache:
+    """
+    公開頁面的渲染結果快取（LRU）。
+
+    以 (endpoint, 路由參數, 查詢字串) 為鍵，超過容量時淘汰最久未使用的項目。
+    寫入公告的路由必須呼叫 invalidate 清掉受影響的頁面。
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[tuple, Tuple[str, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # 每次 invalidate 都遞增；渲染期間若有失效發生，渲染結果就不寫入快取，避免存入舊內容
+        self.generation = 0
+
+    @staticmethod
+    def make_key(endpoint: str, view_args: Dict[str, any], query_args) -> tuple:
+        return (
+            endpoint,
+            tuple(sorted(view_args.items())),
+            tuple(sorted(query_args.items(multi=True))),
+        )
+
+    def get(self, key: tuple) -> Optional[Tuple[str, str]]:
+        """回傳 (HTML, ETag)，未命中時回傳 None。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key: tuple, entry: Tuple[str, str], generation: int) -> None:
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, endpoint: str, **view_args) -> int:
+        """清除指定 endpoint 的快取；有給路由參數時只清除參數相符的項目。回傳清除筆數。"""
+        wanted = set(view_args.items())
+        with self._lock:
+            self.generation += 1
+            stale = [
+                key for key in self._entries
+                if key[0] == endpoint and wanted.issubset(key[1])
+            ]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+page_cache = PageCache(app.config['PAGE_CACHE_SIZE'])
+
+
+def cached_page(f):
+    """
+    快取 GET 請求成功渲染的 HTML 及其 ETag；非字串回應（重導、錯誤）不快取。
+    被此裝飾的頁面屬於公開頁面，由 set_cache_headers 回應 304。
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        # 預先渲染時頁面網址改用指紋檔名，不能與一般請求共用快取
+        if request.method not in ('GET', 'HEAD') or is_static_build():
+            return f(*args, **kwargs)
+
+        sync_page_cache()
+        announcement_feed.check_schedule()
+        key = page_cache.make_key(request.endpoint, kwargs, request.args)
+        generation = page_cache.generation
+        entry = page_cache.get(key)
+        if entry is None:
+            rv = f(*args, **kwargs)
+            if not isinstance(rv, str):
+                return rv
+            entry = (rv, hashlib.sha1(rv.encode('utf-8')).hexdigest())
+            page_cache.set(key, entry, generation)
+
+        g.cache_policy = 'public'
+        response = make_response(entry[0])
+        response.set_etag(entry[1])
+        return response
+    return decorated_function
+
+
+_invalidation_lock = threading.Lock()
+_last_invalidation_id: Optional[int] = None
+_next_invalidation_sync = 0.0
+
+
+def invalidate_page(endpoint: str, **view_args) -> None:
+    """
+    清除本行程的頁面快取，並記錄到 page_cache_invalidations 讓其他 worker 行程同步清除。
+    """
+    page_cache.invalidate(endpoint, **view_args)
+    with get_db_connection() as conn:
+        cursor = conn.execute(
+            'INSERT INTO page_cache_invalidations (pid, endpoint, view_args) VALUES (?, ?, ?)',
+            (os.getpid(), endpoint, json.dumps(view_args))
+        )
+        # 定期清掉舊紀錄，各行程只需要讀取最近的部分
+        if cursor.lastrowid % 100 == 0:
+            conn.execute('DELETE FROM page_cache_invalidations WHERE id < ?', (cursor.lastrowid - 10000,))
+
+
+def sync_page_cache() -> None:
+    """
+    套用其他行程在上次同步之後記錄的快取失效。
+    快取命中時不必每次查詢資料庫：最多每 PAGE_CACHE_SYNC_INTERVAL 秒查詢一次。
+    """
+    global _last_invalidation_id, _next_invalidation_sync
+    now = time.monotonic()
+    if now < _next_invalidation_sync:
+        return
+    conn = get_db_connection()
+    with _invalidation_lock:
+        if now < _next_invalidation_sync:
+            return
+        _next_invalidation_sync = now + app.config['PAGE_CACHE_SYNC_INTERVAL']
+        if _last_invalidation_id is None:
+            # 行程剛啟動時快取是空的，不需要重播過去的紀錄
+            _last_invalidation_id = conn.execute(
+                'SELECT COALESCE(max(id), 0) FROM page_cache_invalidations'
+            ).fetchone()[0]
+            return
+        rows = conn.execute(
+            'SELECT id, pid, endpoint, view_args FROM page_cache_invalidations WHERE id > ? ORDER BY id',
+            (_last_invalidation_id,)
+        ).fetchall()
+        for row in rows:
+            if row['pid'] != os.getpid():
+                view_args = json.loads(row['view_args'])
+                page_cache.invalidate(row['endpoint'], **view_args)
+                hook = _INVALIDATION_HOOKS.get(row['endpoint'])
+                if hook:
+                    hook(view_args)
+        if rows:
+            _last_invalidation_id = rows[-1]['id']
+
+
+# 其他行程記錄的失效除了清頁面快取，也要清掉對應的資料快取
+_INVALIDATION_HOOKS = {
+    'form_dynamic': lambda view_args: form_cache.invalidate(view_args.get('form_id')),
+    'announcement_list': lambda view_args: announcement_feed.invalidate(),
+}
+
+
+def invalidate_announcement_pages(announcement_id: Optional[int] = None) -> None:
+    """公告有異動時清除公告快照、首頁、公告列表，以及（若有指定）該則公告的詳情頁快取。"""
+    announcement_feed.invalidate()
+    invalidate_page('index')
+    invalidate_page('announcement_list')
+    invalidate_page('announcement_search')
+    if announcement_id is not None:
+        invalidate_page('announcement_detail', announcement_id=announcement_id)
+
+
+ANNOUNCEMENT_CARD_COLUMNS = (
+    'id, title, image, timestamp, excerpt, image_variants, publish_at, expire_at,'
+    ' image_width, image_height, image_placeholder'
+)
+# 公開頁面只顯示已到上架時間、尚未下架的公告；兩個參數都是目前時間（YYYY-MM-DD HH:MM）
+ANNOUNCEMENT_VISIBLE_SQL = '(publish_at IS NULL OR publish_at <= ?) AND (expire_at IS NULL OR expire_at > ?)'
+SCHEDULE_FORMAT = '%Y-%m-%d %H:%M'
+
+
+def schedule_now() -> str:
+    """目前的台北時間，格式與 publish_at / expire_at 相同，可直接以字串比較。"""
+    return datetime.now(_TAIPEI).strftime(SCHEDULE_FORMAT)
+
+
+def parse_schedule(value: Optional[str]) -> Optional[str]:
+    """把表單的 datetime-local 值（YYYY-MM-DDTHH:MM）轉成儲存格式，空值或格式錯誤時回傳 None。"""
+    try:
+        return datetime.strptime((value or '').strip()[:16], '%Y-%m-%dT%H:%M').strftime(SCHEDULE_FORMAT)
+    except ValueError:
+        return None
+
+
+def next_schedule_boundary(conn: Connection, now: str) -> Optional[str]:
+    """now 之後最近的一個上架或下架時間，沒有排程時回傳 None。"""
+    return conn.execute(
+        'SELECT min(t) FROM (SELECT min(publish_at) AS t FROM announcements WHERE publish_at > ?'
+        ' UNION ALL SELECT min(expire_at) FROM announcements WHERE expire_at > ?)',
+        (now, now)
+    ).fetchone()[0]
+
+
+def make_excerpt(content: str, length: int = 80) -> str:
+    """由公告內文產生列表卡片用的摘要。"""
+    text = ' '.join(content.split())
+    return text if len(text) <= length else text[:length] + '…'
+
+
+def get_announcement_page(
+    before_id: Optional[int], per_page: int, visible_only: bool = False
+) -> Tuple[List[sqlite3.Row], Optional[int]]:
+    """
+    以 id 為游標（keyset）分頁取得公告卡片所需欄位，不讀取完整內文。
+    visible_only 時只取公開中的公告。回傳 (公告列表, 下一頁游標)，沒有下一頁時游標為 None。
+    """
+    where, params = ['id < ?'], [before_id or sys.maxsize]
+    if visible_only:
+        now = schedule_now()
+        where.append(ANNOUNCEMENT_VISIBLE_SQL)
+        params += [now, now]
+    rows = get_db_connection().execute(
+        f'SELECT {ANNOUNCEMENT_CARD_COLUMNS} FROM announcements WHERE {" AND ".join(where)} ORDER BY id DESC LIMIT ?',
+        (*params, per_page + 1)
+    ).fetchall()
+
+    next_cursor = rows[per_page - 1]['id'] if len(rows) > per_page else None
+    return rows[:per_page], next_cursor
+
+
+class AnnouncementFeed:
+    """
+    公開中公告卡片的記憶體快照（依 id 由新到舊），首頁與公告列表直接從這裡分頁。
+
+    公告異動時由 invalidate_announcement_pages 清除；最近一個排程上架或下架時間到了也會重建，
+    同時清除本行程的公告頁面快取。排程到期由各行程自行判斷，不需要透過資料庫廣播。
+    """
+
+    PAGE_ENDPOINTS = ('index', 'announcement_list', 'announcement_search', 'announcement_detail')
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        # (公告列表, 依 -id 遞增的索引, 是否包含全部公開公告)；None 表示需要重建
+        self._snapshot: Optional[Tuple[List[sqlite3.Row], List[int], bool]] = None
+        self._next_boundary = float('inf')
+        self.generation = 0
+        self.rebuilds = 0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._snapshot = None
+
+    def check_schedule(self) -> None:
+        """
+        確保快照存在且最近的排程時間還沒到；時間到了就重建快照並清除公告頁面快取。
+        每個公開頁面請求都會呼叫，快照有效時只比較一次時間。
+        """
+        self._current()
+
+    def _load(self) -> Tuple[List[sqlite3.Row], List[int], bool, float]:
+        now = schedule_now()
+        conn = get_db_connection()
+        rows = conn.execute(
+            f'SELECT {ANNOUNCEMENT_CARD_COLUMNS} FROM announcements WHERE {ANNOUNCEMENT_VISIBLE_SQL}'
+            ' ORDER BY id DESC LIMIT ?',
+            (now, now, self.max_items + 1)
+        ).fetchall()
+        boundary = next_schedule_boundary(conn, now)
+        next_boundary = (
+            _TAIPEI.localize(datetime.strptime(boundary, SCHEDULE_FORMAT)).timestamp() if boundary else float('inf')
+        )
+        complete = len(rows) <= self.max_items
+        rows = rows[:self.max_items]
+        return rows, [-row['id'] for row in rows], complete, next_boundary
+
+    def _current(self) -> Tuple[List[sqlite3.Row], List[int], bool]:
+        with self._lock:
+            due = time.time() >= self._next_boundary
+            if self._snapshot is not None and not due:
+                return self._snapshot
+            if due:
+                self._next_boundary = float('inf')
+                self._snapshot = None
+                self.generation += 1
+            generation = self.generation
+        if due:
+            for endpoint in self.PAGE_ENDPOINTS:
+                page_cache.invalidate(endpoint)
+
+        rows, index, complete, next_boundary = self._load()
+        snapshot = (rows, index, complete)
+        with self._lock:
+            # 讀取期間若有失效發生，這份結果只用於本次請求
+            if generation == self.generation:
+                self._snapshot = snapshot
+                self._next_boundary = next_boundary
+                self.rebuilds += 1
+        return snapshot
+
+    def page(self, before_id: Optional[int], per_page: int) -> Tuple[List[sqlite3.Row], Optional[int]]:
+        """與 get_announcement_page(visible_only=True) 相同的結果；超出快照範圍時改查資料庫。"""
+        rows, index, complete = self._current()
+        start = bisect.bisect_right(index, -before_id) if before_id else 0
+        if not complete and start + per_page >= len(rows):
+            return get_announcement_page(before_id, per_page, visible_only=True)
+        page = rows[start:start + per_page]
+        next_cursor = page[-1]['id'] if len(rows) > start + per_page else None
+        return page, next_cursor
+
+
+announcement_feed = AnnouncementFeed(app.config['ANNOUNCEMENT_FEED_SIZE'])
+
+
+class ContentAddressedStore:
+    """
+    以內容雜湊存放上傳檔案：uploads/<前2碼>/<3-4碼>/<sha256><副檔名>。
+
+    相同內容只存一份，引用次數記錄在 upload_blobs 資料表；
+    acquire/release 必須在引用該檔案的資料列所在的交易中呼叫，release 回傳 True 時
+    由呼叫端在 commit 之後呼叫 remove 刪除實體檔案。
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, root: str):
+        self.root = root
+
+    @staticmethod
+    def _extension(filename: str) -> str:
+        ext = os.path.splitext(filename)[1].lower()
+        return ext if re.fullmatch(r'\.[a-z0-9]{1,8}', ext) else ''
+
+    def save(self, file) -> str:
+        """儲存表單上傳的檔案；回傳相對於 uploads 的檔名。"""
+        return self.save_stream(file.stream, file.filename)
+
+    @metrics.timed('upload_save_seconds')
+    def save_stream(self, stream, filename: str) -> str:
+        """邊寫入暫存檔邊計算雜湊，完成後搬到雜湊路徑；回傳相對於 uploads 的檔名。"""
+        digest = hashlib.sha256()
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in iter(lambda: stream.read(self.CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    out.write(chunk)
+
+            return self.adopt(tmp_path, digest.hexdigest(), filename)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def adopt(self, tmp_path: str, hexdigest: str, filename: str) -> str:
+        """
+        把已寫好且已算出雜湊的檔案搬到雜湊路徑（同一檔案系統內只是改名），回傳檔名。
+        相同內容已存在時直接刪除 tmp_path。
+        """
+        name = f'{hexdigest[:2]}/{hexdigest[2:4]}/{hexdigest}{self._extension(filename)}'
+        final_path = os.path.join(self.root, name)
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            shutil.move(tmp_path, final_path)
+        return name
+
+    def acquire(self, conn: Connection, name: str) -> None:
+        """增加一次引用。"""
+        size = os.path.getsize(os.path.join(self.root, name))
+        tz = pytz.timezone('Asia/Taipei')
+        conn.execute('''
+            INSERT INTO upload_blobs (filename, size, refcount, created_at) VALUES (?, ?, 1, ?)
+            ON CONFLICT(filename) DO UPDATE SET refcount = refcount + 1
+        ''', (name, size, datetime.now(tz).strftime('%Y-%m-%d %H:%M:%S')))
+
+    def release(self, conn: Connection, name: str) -> bool:
+        """
+        減少一次引用，回傳檔案是否已無人引用、可以刪除。
+        呼叫前須先刪除（或更新）引用該檔案的資料列。
+        """
+        row = conn.execute('SELECT refcount FROM upload_blobs WHERE filename = ?', (name,)).fetchone()
+        if row is None:
+            # 舊版以原檔名直接存放的檔案沒有引用計數，沒有其他資料列使用時才可刪除
+            still_used = conn.execute(
+                'SELECT 1 FROM images WHERE filename = ? UNION ALL SELECT 1 FROM announcements WHERE image = ? LIMIT 1',
+                (name, name)
+            ).fetchone()
+            return still_used is None
+        if row['refcount'] > 1:
+            conn.execute('UPDATE upload_blobs SET refcount = refcount - 1 WHERE filename = ?', (name,))
+            return False
+        conn.execute('DELETE FROM upload_blobs WHERE filename = ?', (name,))
+        return True
+
+    def remove(self, name: str) -> None:
+        """刪除檔案本身與其縮圖。"""
+        path = safe_join(self.root, name)
+        if path and os.path.exists(path):
+            os.remove(path)
+        stem = os.path.splitext(name)[0]
+        for variant in glob.glob(os.path.join(app.config['IMAGE_VARIANT_FOLDER'], glob.escape(stem) + '_*.webp')):
+            os.remove(variant)
+
+
+upload_store = ContentAddressedStore(app.config['UPLOAD_FOLDER'])
+
+
+class ChunkedUploadManager:
+    """
+    可續傳的分段上傳。
+
+    每個上傳工作對應 upload_parts/<id>.part，各段依 offset 寫進同一個檔案，
+    upload_sessions.received 記錄已確實寫入磁碟的位元組數，連線中斷後用戶端查詢該值再從那裡續傳。
+    SHA-256 在接收時逐段計算，收齊後直接把分段檔搬進 ContentAddressedStore，不必重讀整個檔案。
+    完成的上傳先持有一次檔案引用，由 claim 在寫入公告或圖片資料列的交易中轉移給該資料列。
+    """
+
+    def __init__(self, folder: str, store: ContentAddressedStore):
+        self.folder = folder
+        self.store = store
+        # 上傳 id -> (已涵蓋的位元組數, 雜湊物件)；只是省去重讀，行程重啟或換 worker 時會重新計算
+        self._hashers: Dict[str, Tuple[int, any]] = {}
+        self._lock = threading.Lock()
+        # 沒有 fcntl 時，本行程內正在寫入的上傳 id
+        self._writing: set = set()
+
+    def _part_path(self, upload_id: str) -> str:
+        return os.path.join(self.folder, f'{upload_id}.part')
+
+    def create(self, conn: Connection, filename: str, size: int) -> str:
+        """建立上傳工作並回傳其 id；順便清除逾期的工作。"""
+        self.expire(conn, time.time() - app.config['UPLOAD_SESSION_TTL'])
+        upload_id = secrets.token_hex(16)
+        os.makedirs(self.folder, exist_ok=True)
+        open(self._part_path(upload_id), 'wb').close()
+        conn.execute(
+            'INSERT INTO upload_sessions (id, filename, size, received, updated_at) VALUES (?, ?, ?, 0, ?)',
+            (upload_id, filename, size, time.time())
+        )
+        return upload_id
+
+    @staticmethod
+    def get(conn: Connection, upload_id: str) -> Optional[sqlite3.Row]:
+        return conn.execute('SELECT * FROM upload_sessions WHERE id = ?', (upload_id,)).fetchone()
+
+    def _hasher(self, upload_id: str, offset: int):
+        """取得已涵蓋前 offset 個位元組的雜湊物件。"""
+        with self._lock:
+            entry = self._hashers.pop(upload_id, None)
+        if entry is not None and entry[0] == offset:
+            return entry[1]
+        digest = hashlib.sha256()
+        with open(self._part_path(upload_id), 'rb') as f:
+            remaining = offset
+            while remaining:
+                chunk = f.read(min(ContentAddressedStore.CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                remaining -= len(chunk)
+        return digest
+
+    def _try_lock(self, upload_id: str, f) -> bool:
+        """取得寫入同一上傳工作的獨占鎖（跨 worker 行程），已被其他請求持有時回傳 False。"""
+        if fcntl is not None:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            return True
+        with self._lock:
+            if upload_id in self._writing:
+                return False
+            self._writing.add(upload_id)
+            return True
+
+    def _unlock(self, upload_id: str, f) -> None:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        else:
+            with self._lock:
+                self._writing.discard(upload_id)
+
+    @metrics.timed('upload_chunk_seconds')
+    def write_chunk(self, conn: Connection, upload: sqlite3.Row, stream) -> Optional[int]:
+        """
+        從 stream 讀取一段資料接在 upload['received'] 之後，回傳新的 received。
+        資料超過宣告的檔案大小時拋出 ValueError；同時有其他請求寫入同一工作時回傳 None。
+        收齊後把檔案搬進 upload_store，記錄到 upload_sessions.blob。
+
+        寫入期間持有分段檔的獨占鎖，並在取得鎖之後重新確認進度，
+        同一位置的並行請求只有一個會寫入檔案，磁碟上的內容一定與計算出的雜湊相符。
+        """
+        upload_id, offset = upload['id'], upload['received']
+        try:
+            out = open(self._part_path(upload_id), 'r+b')
+        except FileNotFoundError:
+            return None  # 已收齊並搬進 upload_store，或已逾期刪除
+        with out:
+            if not self._try_lock(upload_id, out):
+                return None
+            try:
+                current = self.get(conn, upload_id)
+                # 已收齊的工作不再接受寫入，收尾（搬進 upload_store）只會由寫完最後一段的請求執行
+                if current is None or current['received'] != offset or current['received'] == current['size']:
+                    return None
+                written = self._write_locked(conn, upload, out, stream)
+            finally:
+                self._unlock(upload_id, out)
+        if written is None:
+            return None
+
+        received, digest = written
+        if received == upload['size']:
+            # 分段檔關閉後再搬移（Windows 無法搬移開啟中的檔案）
+            blob = self.store.adopt(self._part_path(upload_id), digest.hexdigest(), upload['filename'])
+            with conn:
+                self.store.acquire(conn, blob)
+                conn.execute('UPDATE upload_sessions SET blob = ? WHERE id = ?', (blob, upload_id))
+        return received
+
+    def _write_locked(self, conn: Connection, upload: sqlite3.Row, out, stream) -> Optional[Tuple[int, any]]:
+        """在持有鎖的情況下寫入一段並更新進度，回傳 (新的 received, 雜湊物件)；進度已被改變時回傳 None。"""
+        upload_id, offset = upload['id'], upload['received']
+        digest = self._hasher(upload_id, offset)
+        remaining = upload['size'] - offset
+        out.seek(offset)
+        while remaining:
+            chunk = stream.read(min(ContentAddressedStore.CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+            remaining -= len(chunk)
+        if not remaining and stream.read(1):
+            raise ValueError('資料超過宣告的檔案大小')
+        received = out.tell()
+        # 先前中斷的請求可能寫過更後面的位置，截掉未確認的部分
+        out.truncate()
+        out.flush()
+        os.fsync(out.fileno())
+
+        with conn:
+            updated = conn.execute(
+                'UPDATE upload_sessions SET received = ?, updated_at = ? WHERE id = ? AND received = ?',
+                (received, time.time(), upload_id, offset)
+            ).rowcount
+        if not updated:
+            return None
+
+        if received < upload['size']:
+            with self._lock:
+                self._hashers[upload_id] = (received, digest)
+        return received, digest
+
+    @staticmethod
+    def claim(conn: Connection, upload_id: str) -> Optional[str]:
+        """
+        取出已完成上傳的檔名並刪除上傳工作，檔案引用轉移給呼叫端即將寫入的資料列（不必再 acquire）。
+        必須在寫入該資料列的交易中呼叫；上傳不存在或尚未完成時回傳 None。
+        """
+        row = conn.execute(
+            'SELECT blob FROM upload_sessions WHERE id = ? AND blob IS NOT NULL', (upload_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute('DELETE FROM upload_sessions WHERE id = ?', (upload_id,))
+        return row['blob']
+
+    def expire(self, conn: Connection, before: float) -> int:
+        """刪除 before 之前就沒有進度的上傳工作與其分段檔；已完成但沒被使用的檔案釋放引用。回傳刪除筆數。"""
+        removable = []
+        with conn:
+            rows = conn.execute(
+                'SELECT id, blob FROM upload_sessions WHERE updated_at < ?', (before,)
+            ).fetchall()
+            for row in rows:
+                conn.execute('DELETE FROM upload_sessions WHERE id = ?', (row['id'],))
+                if row['blob'] and self.store.release(conn, row['blob']):
+                    removable.append(row['blob'])
+        for row in rows:
+            if not row['blob'] and os.path.exists(self._part_path(row['id'])):
+                os.remove(self._part_path(row['id']))
+            with self._lock:
+                self._hashers.pop(row['id'], None)
+        for name in removable:
+            self.store.remove(name)
+        return len(rows)
+
+
+chunked_uploads = ChunkedUploadManager(app.config['UPLOAD_PARTS_FOLDER'], upload_store)
+
+
+def _take_cover_image(conn: Connection, saved_name: Optional[str], upload_id: Optional[str]) -> Optional[str]:
+    """
+    取得新封面並持有一次引用：優先使用表單直接上傳（已存檔）的檔案，其次是已完成的分段上傳。
+    """
+    if saved_name:
+        upload_store.acquire(conn, saved_name)
+        return saved_name
+    if upload_id:
+        return chunked_uploads.claim(conn, upload_id)
+    return None
+
+
+def _attach_images(conn: Connection, announcement_id: int, files, upload_ids: List[str] = ()) -> List[Tuple[str, int, str]]:
+    """
+    儲存公告的附加圖片並寫入 images，回傳待產生縮圖的工作。
+    files 是表單直接上傳的檔案，upload_ids 是已完成的分段上傳。
+    """
+    names = []
+    for img in files:
+        if img and img.filename:
+            img_name = upload_store.save(img)
+            upload_store.acquire(conn, img_name)
+            names.append(img_name)
+    for upload_id in upload_ids:
+        img_name = chunked_uploads.claim(conn, upload_id)
+        if img_name:
+            names.append(img_name)
+
+    variant_jobs = []
+    for img_name in names:
+        cursor = conn.execute(
+            'INSERT INTO images (announcement_id, filename) VALUES (?, ?)',
+            (announcement_id, img_name)
+        )
+        variant_jobs.append(('images', cursor.lastrowid, img_name))
+    return variant_jobs
+
+
+image_executor = ThreadPoolExecutor(max_workers=app.config['IMAGE_WORKERS'], thread_name_prefix='image')
+
+# 圖片資訊的欄位（縮圖、寬、高、模糊預覽）：封面存在 announcements，附加圖片存在 images
+_IMAGE_COLUMNS = {
+    'announcements': ('image_variants', 'image_width', 'image_height', 'image_placeholder'),
+    'images': ('variants', 'width', 'height', 'placeholder'),
+}
+
+
+def open_uploaded_image(filename: str) -> Optional['Image.Image']:
+    """
+    讀取 uploads 中的圖片並依 EXIF 轉正，轉成 RGB / RGBA。非圖片（例如影片）或未安裝 Pillow 時回傳 None。
+    """
+    if Image is None:
+        return None
+
+    source = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    try:
+        with Image.open(source) as original:
+            img = ImageOps.exif_transpose(original)
+            img.load()
+    except (OSError, Image.DecompressionBombError):
+        return None
+
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'P') else 'RGB')
+    return img
+
+
+def generate_image_variants(filename: str, img: 'Image.Image') -> Dict[str, str]:
+    """
+    為 uploads 中的圖片產生多種寬度的 WebP 縮圖（不含 EXIF 等中繼資料）。
+    回傳 {寬度: 相對於 uploads 的檔名}。
+    """
+    stem = os.path.splitext(filename)[0]
+    widths = [w for w in app.config['IMAGE_VARIANT_WIDTHS'] if w < img.width] or [img.width]
+    variants = {}
+    for width in widths:
+        variant_path = os.path.join(app.config['IMAGE_VARIANT_FOLDER'], f'{stem}_{width}.webp')
+        # 內容定址的檔名代表內容相同，已產生過的縮圖直接沿用
+        if not os.path.exists(variant_path):
+            os.makedirs(os.path.dirname(variant_path), exist_ok=True)
+            height = max(1, round(img.height * width / img.width))
+            img.resize((width, height), Image.LANCZOS).save(
+                variant_path, 'WEBP', quality=app.config['IMAGE_VARIANT_QUALITY'], method=4
+            )
+        variants[str(width)] = os.path.relpath(variant_path, app.config['UPLOAD_FOLDER']).replace(os.sep, '/')
+    return variants
+
+
+def image_placeholder(img: 'Image.Image') -> Optional[str]:
+    """
+    縮成長邊 IMAGE_PLACEHOLDER_SIZE 像素的 WebP data URI（約 100 bytes），作為圖片載入前的背景。
+    有透明區域的圖片載入後仍會透出背景，不產生預覽。
+    """
+    if img.mode == 'RGBA':
+        return None
+    size = app.config['IMAGE_PLACEHOLDER_SIZE']
+    scale = size / max(img.width, img.height)
+    thumb = img.resize(
+        (max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.BILINEAR, reducing_gap=3.0
+    )
+    buffer = io.BytesIO()
+    thumb.save(buffer, 'WEBP', quality=app.config['IMAGE_PLACEHOLDER_QUALITY'])
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def _process_uploaded_image(table: str, row_id: int, filename: str, announcement_id: int) -> None:
+    """背景工作：產生縮圖、記錄尺寸與模糊預覽並寫回資料表，再清除受影響頁面的快取。"""
+    try:
+        img = open_uploaded_image(filename)
+        if img is None:
+            return
+        variants = generate_image_variants(filename, img)
+        variants_column, width_column, height_column, placeholder_column = _IMAGE_COLUMNS[table]
+        with get_db_connection() as conn:
+            conn.execute(
+                f'UPDATE {table} SET {variants_column} = ?, {width_column} = ?, {height_column} = ?,'
+                f' {placeholder_column} = ? WHERE id = ?',
+                (json.dumps(variants), img.width, img.height, image_placeholder(img), row_id)
+            )
+        invalidate_announcement_pages(announcement_id)
+    except Exception as e:
+        print(f"縮圖產生失敗 {filename}: {e}")
+
+
+def schedule_image_variants(jobs: List[Tuple[str, int, str]], announcement_id: int) -> None:
+    """
+    將 (資料表, 資料列 id, 檔名) 交給背景執行緒產生縮圖、尺寸與模糊預覽。必須在資料列 commit 之後呼叫。
+    """
+    for table, row_id, filename in jobs:
+        image_executor.submit(_process_uploaded_image, table, row_id, filename, announcement_id)
+
+
+@app.cli.command('generate-image-variants')
+def generate_image_variants_command() -> None:
+    """為尚未產生縮圖、尺寸或模糊預覽的既有上傳圖片補上這些資訊。"""
+    create_app(start_ingestor=False)
+    conn = get_db_connection()
+    jobs = [
+        ('announcements', row['id'], row['image'], row['id'])
+        for row in conn.execute(
+            'SELECT id, image FROM announcements'
+            ' WHERE image IS NOT NULL AND (image_variants IS NULL OR image_width IS NULL)'
+        )
+    ] + [
+        ('images', row['id'], row['filename'], row['announcement_id'])
+        for row in conn.execute(
+            'SELECT id, filename, announcement_id FROM images WHERE variants IS NULL OR width IS NULL'
+        )
+    ]
+    for table, row_id, filename, announcement_id in jobs:
+        _process_uploaded_image(table, row_id, filename, announcement_id)
+    print(f"已處理 {len(jobs)} 張圖片")
+
+
+def _iter_sorted_files(root: str, prefix: str = '', skip: Tuple[str, ...] = ()) -> Iterator[str]:
+    """
+    依完整相對路徑的字典順序（與 SQLite 預設的 BINARY 排序一致）逐一產生 root 底下的檔案，
+    一次只讀一層目錄。目錄名稱以「名稱/」參與排序，子檔案才會排在正確位置。
+    """
+    try:
+        entries = list(os.scandir(root))
+    except FileNotFoundError:
+        return
+    keyed = sorted((entry.name + ('/' if entry.is_dir(follow_symlinks=False) else ''), entry) for entry in entries)
+    for key, entry in keyed:
+        path = prefix + entry.name
+        if key.endswith('/'):
+            if path not in skip:
+                yield from _iter_sorted_files(entry.path, path + '/', skip)
+        elif entry.is_file(follow_symlinks=False):
+            yield path
+
+
+def _diff_sorted(on_disk: Iterator[str], referenced: Iterator[str]) -> Iterator[Tuple[str, str]]:
+    """合併兩個已排序的串流：只在磁碟上的產生 ('orphan', 名稱)，只在資料庫中的產生 ('missing', 名稱)。"""
+    disk, ref = next(on_disk, None), next(referenced, None)
+    while disk is not None or ref is not None:
+        if ref is None or (disk is not None and disk < ref):
+            yield 'orphan', disk
+            disk = next(on_disk, None)
+        elif disk is None or ref < disk:
+            yield 'missing', ref
+            ref = next(referenced, None)
+        else:
+            disk, ref = next(on_disk, None), next(referenced, None)
+
+
+# 所有引用上傳檔案的地方：公告封面、附加圖片、引用計數表、已完成但尚未使用的分段上傳
+_REFERENCED_UPLOADS_SQL = '''
+    SELECT image FROM announcements WHERE image IS NOT NULL
+    UNION SELECT filename FROM images
+    UNION SELECT filename FROM upload_blobs
+    UNION SELECT blob FROM upload_sessions WHERE blob IS NOT NULL
+    ORDER BY 1
+'''
+_REFERENCED_VARIANTS_SQL = '''
+    SELECT v.value FROM announcements, json_each(announcements.image_variants) AS v
+    WHERE announcements.image_variants IS NOT NULL
+    UNION SELECT v.value FROM images, json_each(images.variants) AS v WHERE images.variants IS NOT NULL
+    ORDER BY 1
+'''
+
+
+def collect_upload_garbage(delete: bool, grace_seconds: float) -> Dict[str, List[str]]:
+    """
+    找出（並在 delete 為 True 時刪除）上傳資料夾中沒有被引用的檔案與縮圖、公告已刪除的 images 資料列，
+    並列出資料庫有引用但檔案已不存在的項目。
+
+    磁碟與資料庫兩邊都以排序後的串流逐筆比對，記憶體用量與檔案數量無關。
+    修改時間在 grace_seconds 內的檔案可能正在上傳或產生縮圖，一律略過。
+    """
+    upload_root = app.config['UPLOAD_FOLDER']
+    variant_root = app.config['IMAGE_VARIANT_FOLDER']
+    variant_prefix = os.path.relpath(variant_root, upload_root).replace(os.sep, '/')
+    parts_prefix = os.path.relpath(app.config['UPLOAD_PARTS_FOLDER'], upload_root).replace(os.sep, '/')
+    cutoff = time.time() - grace_seconds
+    report: Dict[str, List[str]] = {'orphan_rows': [], 'orphan_files': [], 'orphan_variants': [], 'missing_files': []}
+
+    conn = get_db_connection()
+    orphan_rows = conn.execute(
+        'SELECT id, filename FROM images WHERE announcement_id NOT IN (SELECT id FROM announcements)'
+    ).fetchall()
+    report['orphan_rows'] = [f"images#{row['id']} {row['filename']}" for row in orphan_rows]
+    if delete and orphan_rows:
+        with conn:
+            for row in orphan_rows:
+                conn.execute('DELETE FROM images WHERE id = ?', (row['id'],))
+                upload_store.release(conn, row['filename'])
+
+    def old_enough(path: str) -> bool:
+        try:
+            return os.path.getmtime(path) < cutoff
+        except FileNotFoundError:
+            return False
+
+    # 檔案本身：縮圖與分段上傳的目錄另外處理
+    referenced = (row[0] for row in get_db_connection().execute(_REFERENCED_UPLOADS_SQL))
+    on_disk = _iter_sorted_files(upload_root, skip=(variant_prefix, parts_prefix))
+    for kind, name in _diff_sorted(on_disk, referenced):
+        if kind == 'missing':
+            report['missing_files'].append(name)
+        elif old_enough(os.path.join(upload_root, name)):
+            report['orphan_files'].append(name)
+            if delete:
+                os.remove(os.path.join(upload_root, name))
+
+    # 縮圖：以資料庫記錄的縮圖路徑（相對於 uploads）比對
+    referenced = (row[0] for row in get_db_connection().execute(_REFERENCED_VARIANTS_SQL))
+    on_disk = (f'{variant_prefix}/{name}' for name in _iter_sorted_files(variant_root))
+    for kind, name in _diff_sorted(on_disk, referenced):
+        if kind == 'orphan' and old_enough(os.path.join(upload_root, name)):
+            report['orphan_variants'].append(name)
+            if delete:
+                os.remove(os.path.join(upload_root, name))
+    return report
+
+
+def _database_size() -> int:
+    """資料庫檔案加上尚未併回的 WAL 的大小。"""
+    return sum(
+        os.path.getsize(path) for path in (app.config['DATABASE'], app.config['DATABASE'] + '-wal')
+        if os.path.exists(path)
+    )
+
+
+def compact_database() -> None:
+    """更新查詢規劃用的統計資料並重整資料庫檔案，最後把 WAL 併回主檔。"""
+    conn = get_db_connection()
+    conn.execute('ANALYZE')
+    conn.execute('PRAGMA optimize')
+    conn.execute('VACUUM')
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+
+@app.cli.command('gc-uploads')
+@click.option('--delete', is_flag=True, help='實際刪除；未指定時只列出（dry run）')
+@click.option('--grace-minutes', default=60, show_default=True, help='略過最近修改過的檔案')
+@click.option('--report', 'report_path', type=click.Path(dir_okay=False), help='把完整清單寫成 JSON 檔')
+@click.option('--no-compact', is_flag=True, help='不執行 ANALYZE / optimize / VACUUM')
+def gc_uploads_command(delete: bool, grace_minutes: int, report_path: Optional[str], no_compact: bool) -> None:
+    """清除沒有被引用的上傳檔案、縮圖與孤立的 images 資料列，並整理資料庫。"""
+    create_app(start_ingestor=False)
+    chunked_uploads.expire(get_db_connection(), time.time() - app.config['UPLOAD_SESSION_TTL'])
+    report = collect_upload_garbage(delete, grace_minutes * 60)
+    if delete:
+        invalidate_announcement_pages()
+
+    size_before = _database_size()
+    if not no_compact:
+        try:
+            compact_database()
+        except sqlite3.Error as e:
+            no_compact = True
+            print(f"資料庫整理失敗: {e}")
+
+    action = '已刪除' if delete else '可刪除（dry run）'
+    print(f"孤立的 images 資料列 {action}: {len(report['orphan_rows'])}")
+    print(f"沒有引用的上傳檔案 {action}: {len(report['orphan_files'])}")
+    print(f"沒有引用的縮圖 {action}: {len(report['orphan_variants'])}")
+    print(f"資料庫有引用但檔案不存在: {len(report['missing_files'])}")
+    if not no_compact:
+        print(f"資料庫大小（含 WAL）: {size_before} -> {_database_size()} bytes")
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+# 公告備份檔（zip）：announcements.jsonl 每行一則公告，圖片放在 files/ 底下，以 image / images 欄位引用
+ARCHIVE_INDEX = 'announcements.jsonl'
+ARCHIVE_FILES_PREFIX = 'files/'
+
+
+class _StreamBuffer:
+    """給 zipfile 寫入的不可 seek 輸出，寫入的資料累積起來由 drain 取出。"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.pending = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self.pending += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        self.pending = 0
+        return data
+
+
+def export_announcements_archive() -> Iterator[bytes]:
+    """
+    逐段產生所有公告與其圖片的 zip 備份，不會把整個檔案放進記憶體。
+    先寫 announcements.jsonl，再依檔名寫入每個被引用的檔案（相同內容只存一份）。
+    """
+    buffer = _StreamBuffer()
+    conn = get_db_connection()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(ARCHIVE_INDEX, 'w', force_zip64=True) as index:
+            announcements = conn.execute(
+                'SELECT id, title, content, image, timestamp, publish_at, expire_at FROM announcements ORDER BY id'
+            )
+            # 兩個游標都依公告 id 排序，一起往前走即可配對出每則公告的附加圖片
+            images = conn.execute('SELECT announcement_id, filename FROM images ORDER BY announcement_id, id')
+            image = images.fetchone()
+            for row in announcements:
+                while image is not None and image['announcement_id'] < row['id']:
+                    image = images.fetchone()
+                attached = []
+                while image is not None and image['announcement_id'] == row['id']:
+                    attached.append(ARCHIVE_FILES_PREFIX + image['filename'])
+                    image = images.fetchone()
+                record = {**dict(row), 'image': row['image'] and ARCHIVE_FILES_PREFIX + row['image'],
+                          'images': attached}
+                index.write(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n')
+                if buffer.pending >= ContentAddressedStore.CHUNK_SIZE:
+                    yield buffer.drain()
+        yield buffer.drain()
+
+        for row in conn.execute('''
+            SELECT image FROM announcements WHERE image IS NOT NULL UNION SELECT filename FROM images ORDER BY 1
+        '''):
+            path = safe_join(app.config['UPLOAD_FOLDER'], row[0])
+            if path and os.path.isfile(path):
+                # 圖片本身已壓縮過，不再 deflate
+                archive.write(path, ARCHIVE_FILES_PREFIX + row[0], compress_type=zipfile.ZIP_STORED)
+                yield buffer.drain()
+    yield buffer.drain()
+
+
+def _parse_archive_record(line: bytes, today: str) -> Optional[Dict[str, any]]:
+    """驗證並整理備份檔中的一則公告，格式不正確時回傳 None。"""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, dict) or not isinstance(record.get('title'), str) \
+            or not isinstance(record.get('content'), str) or not record['title'].strip():
+        return None
+    images = record.get('images') or []
+    if not isinstance(images, list) or not all(isinstance(name, str) for name in images):
+        return None
+    image = record.get('image')
+    return {
+        'title': record['title'],
+        'content': record['content'],
+        'timestamp': str(record.get('timestamp') or today)[:10],
+        'publish_at': parse_schedule(str(record.get('publish_at') or '').replace(' ', 'T')),
+        'expire_at': parse_schedule(str(record.get('expire_at') or '').replace(' ', 'T')),
+        'image': image if isinstance(image, str) and image else None,
+        'images': images,
+    }
+
+
+def import_announcements_archive(path: str, batch_size: Optional[int] = None) -> Dict[str, any]:
+    """
+    匯入 zip 備份中的公告（新增，不覆蓋既有公告）。
+
+    圖片由執行緒池平行解壓縮進 upload_store；每 batch_size 則公告在一個交易內以 executemany
+    寫入 announcements、images 與 upload_blobs。新公告的 id 在交易內依序配發，
+    不必逐筆 INSERT 取得 lastrowid。匯入後不產生縮圖，可再執行 flask generate-image-variants。
+    """
+    batch_size = batch_size or app.config['BULK_IMPORT_BATCH_SIZE']
+    started = time.perf_counter()
+    today = datetime.now(_TAIPEI).strftime('%Y-%m-%d')
+    report: Dict[str, any] = {'announcements': 0, 'images': 0, 'files': 0, 'skipped_lines': []}
+    copied: Dict[str, Future] = {}
+    local = threading.local()
+    opened: List[zipfile.ZipFile] = []
+
+    def copy_member(member: str) -> Optional[str]:
+        # 每個執行緒各自開啟 zip，解壓縮才能真正平行
+        archive = getattr(local, 'archive', None)
+        if archive is None:
+            archive = local.archive = zipfile.ZipFile(path)
+            opened.append(archive)
+        try:
+            with archive.open(member) as src:
+                return upload_store.save_stream(src, member)
+        except KeyError:
+            return None
+
+    def stored_name(member: Optional[str]) -> Optional[str]:
+        if not member or member not in copied:
+            return None
+        return copied[member].result()
+
+    def flush(batch: List[Dict[str, any]]) -> None:
+        names = [stored_name(r['image']) for r in batch]
+        conn = get_db_connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            base = conn.execute('''
+                SELECT max(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'announcements'), 0),
+                           COALESCE((SELECT max(id) FROM announcements), 0))
+            ''').fetchone()[0]
+            conn.executemany(
+                'INSERT INTO announcements (id, title, content, image, timestamp, excerpt, publish_at, expire_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [
+                    (base + i + 1, r['title'], r['content'], name, r['timestamp'], make_excerpt(r['content']),
+                     r['publish_at'], r['expire_at'])
+                    for i, (r, name) in enumerate(zip(batch, names))
+                ]
+            )
+            image_rows = [
+                (base + i + 1, name)
+                for i, r in enumerate(batch)
+                for name in (stored_name(member) for member in r['images']) if name
+            ]
+            conn.executemany('INSERT INTO images (announcement_id, filename) VALUES (?, ?)', image_rows)
+
+            refs = Counter([name for name in names if name] + [name for _, name in image_rows])
+            created_at = datetime.now(_TAIPEI).strftime('%Y-%m-%d %H:%M:%S')
+            conn.executemany('''
+                INSERT INTO upload_blobs (filename, size, refcount, created_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(filename) DO UPDATE SET refcount = refcount + excluded.refcount
+            ''', [
+                (name, os.path.getsize(os.path.join(app.config['UPLOAD_FOLDER'], name)), count, created_at)
+                for name, count in refs.items()
+            ])
+        report['announcements'] += len(batch)
+        report['images'] += len(image_rows)
+
+    try:
+        with zipfile.ZipFile(path) as archive, \
+                ThreadPoolExecutor(max_workers=app.config['BULK_IMPORT_WORKERS'], thread_name_prefix='import') as pool:
+            members = set(archive.namelist())
+            batch: List[Dict[str, any]] = []
+            with archive.open(ARCHIVE_INDEX) as index:
+                for line_no, line in enumerate(index, 1):
+                    if not line.strip():
+                        continue
+                    record = _parse_archive_record(line, today)
+                    if record is None:
+                        report['skipped_lines'].append(line_no)
+                        continue
+                    for member in ([record['image']] if record['image'] else []) + record['images']:
+                        if member not in copied and member.startswith(ARCHIVE_FILES_PREFIX) and member in members:
+                            copied[member] = pool.submit(copy_member, member)
+                    batch.append(record)
+                    if len(batch) >= batch_size:
+                        flush(batch)
+                        batch = []
+            if batch:
+                flush(batch)
+    finally:
+        for archive in opened:
+            archive.close()
+
+    report['files'] = sum(1 for future in copied.values() if future.result())
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    report['rows_per_second'] = round(report['announcements'] / report['seconds'], 1) if report['seconds'] else 0
+    invalidate_announcement_pages()
+    return report
+
+
+@app.cli.command('import-announcements')
+@click.argument('archive', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', type=int, help='每個交易寫入的公告數')
+def import_announcements_command(archive: str, batch_size: Optional[int]) -> None:
+    """從 zip 備份檔匯入公告與圖片。"""
+    create_app(start_ingestor=False)
+    report = import_announcements_archive(archive, batch_size)
+    print(f"已匯入 {report['announcements']} 則公告、{report['images']} 張附加圖片、{report['files']} 個檔案，"
+          f"耗時 {report['seconds']} 秒（{report['rows_per_second']} 則/秒）")
+    if report['skipped_lines']:
+        print(f"格式錯誤而略過的行: {report['skipped_lines'][:20]}")
+
+
+@app.cli.command('export-announcements')
+@click.argument('output', type=click.Path(dir_okay=False))
+def export_announcements_command(output: str) -> None:
+    """把所有公告與圖片匯出成 zip 備份檔。"""
+    create_app(start_ingestor=False)
+    with open(output, 'wb') as f:
+        for chunk in export_announcements_archive():
+            f.write(chunk)
+    print(f"已匯出到 {output}")
+
+
+@app.template_filter('srcset')
+def srcset_filter(variants_json: Optional[str]) -> str:
+    """把資料庫中的縮圖 JSON 轉成 <img srcset> 字串。"""
+    if not variants_json:
+        return ''
+    variants = json.loads(variants_json)
+    return ', '.join(
+        f"{url_for('static', filename='uploads/' + name)} {width}w"
+        for width, name in sorted(variants.items(), key=lambda item: int(item[0]))
+    )
+
+
+# 搜尋結果中標示關鍵字的暫用符號，跳脫 HTML 之後再換成 <mark>
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+
+def _render_highlight(text: str) -> Markup:
+    return Markup(
+        str(escape(text)).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+    )
+
+
+def _fts_query(query: str) -> str:
+    """把使用者輸入轉成 FTS5 查詢：以空白分隔的每個詞都當作片語，全部都要符合。"""
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+def search_announcements(query: str, page: int, per_page: int) -> Tuple[List[Dict[str, any]], bool]:
+    """
+    全文搜尋公告，依 bm25 排序（標題權重較高），回傳 (結果, 是否有下一頁)。
+    每筆結果含已標示關鍵字的 title_html 與 snippet_html。
+    trigram 無法比對少於三個字的詞，這種情況改用 LIKE 查詢。
+    """
+    terms = query.split()
+    if not terms:
+        return [], False
+
+    conn = get_db_connection()
+    now = schedule_now()
+    has_fts = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'announcements_fts'"
+    ).fetchone()
+    offset = (page - 1) * per_page
+
+    use_fts = has_fts and all(len(term) >= 3 for term in terms)
+    if use_fts:
+        rows = conn.execute(f'''
+            SELECT a.id, a.image, a.timestamp,
+                   highlight(announcements_fts, 0, ?, ?) AS title_marked,
+                   snippet(announcements_fts, 1, ?, ?, '…', 24) AS snippet_marked
+            FROM announcements_fts
+            JOIN announcements AS a ON a.id = announcements_fts.rowid
+            WHERE announcements_fts MATCH ? AND {ANNOUNCEMENT_VISIBLE_SQL}
+            ORDER BY bm25(announcements_fts, 10.0, 1.0)
+            LIMIT ? OFFSET ?
+        ''', (
+            _MARK_START, _MARK_END, _MARK_START, _MARK_END, _fts_query(query), now, now, per_page + 1, offset
+        )).fetchall()
+    else:
+        # 跳脫 LIKE 的萬用字元，搜尋 % 或 _ 時只比對字面上的字元，與 FTS 的結果一致
+        where = ' AND '.join([r"(title LIKE ? ESCAPE '\' OR content LIKE ? ESCAPE '\')"] * len(terms))
+        patterns = ['%' + re.sub(r'([\\%_])', r'\\\1', term) + '%' for term in terms]
+        params = [p for pattern in patterns for p in (pattern, pattern)]
+        rows = conn.execute(
+            f'SELECT id, image, timestamp, title AS title_marked, excerpt AS snippet_marked '
+            f'FROM announcements WHERE {where} AND {ANNOUNCEMENT_VISIBLE_SQL} ORDER BY id DESC LIMIT ? OFFSET ?',
+            (*params, now, now, per_page + 1, offset)
+        ).fetchall()
+
+    def mark(text: str) -> str:
+        if use_fts:
+            return text
+        pattern = '|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+        return re.sub(pattern, lambda m: _MARK_START + m.group(0) + _MARK_END, text, flags=re.IGNORECASE)
+
+    results = [
+        {
+            'id': row['id'],
+            'image': row['image'],
+            'timestamp': row['timestamp'],
+            'title_html': _render_highlight(mark(row['title_marked'])),
+            'snippet_html': _render_highlight(mark(row['snippet_marked'] or '')),
+        }
+        for row in rows[:per_page]
+    ]
+    return results, len(rows) > per_page
+
+
 def _validate_and_prepare_fields(fields_input: str) -> Tuple[Optional[str], Optional[List[Dict[str, str]]]]:
     """驗證自訂欄位輸入並準備儲存結構。回傳 (錯誤訊息, 欄位資料)。"""
     if not fields_input:
@@ -126,146 +2385,485 @@ def get_all_forms() -> List[sqlite3.Row]:
         return conn.execute('SELECT * FROM forms ORDER BY id DESC').fetchall()
 
 
-def get_form_by_id(form_id: int) -> Optional[sqlite3.Row]:
-    """根據 ID 取得單一表單。"""
+SUBMISSIONS_TABLE = 'form_submissions'
+# 固定欄位的顯示名稱；自訂欄位存在 fields JSON 欄位中
+SUBMISSION_HEADER_MAP = {'name': '姓名', 'email': '電子郵件', 'phone': '手機號碼', 'timestamp': '提交時間'}
+
+# 所有表單共用 form_submissions，SQL 字串固定不變，連線的 statement cache 會保留編譯好的語句
+SUBMISSION_INSERT_SQL = (
+    f'INSERT INTO {SUBMISSIONS_TABLE} (form_id, name, email, phone, fields, timestamp) VALUES (?, ?, ?, ?, ?, ?)'
+)
+SUBMISSION_PAGE_SQL = (
+    f'SELECT id, name, email, phone, fields, timestamp FROM {SUBMISSIONS_TABLE}'
+    ' WHERE form_id = ? AND id < ? ORDER BY id DESC LIMIT ?'
+)
+SUBMISSION_EXPORT_SQL = (
+    f'SELECT name, email, phone, fields, timestamp FROM {SUBMISSIONS_TABLE} WHERE form_id = ? ORDER BY id'
+)
+
+
+class FormDefinition:
+    """
+    解析好的表單定義：自訂欄位名稱與表頭在建立時算好，之後唯讀共用。
+    支援 form['title'] 形式的存取，與原本回傳的 sqlite3.Row 相容。
+    """
+
+    __slots__ = ('id', 'title', 'description', 'table_name', 'created_at', 'field_names', 'headers')
+
+    def __init__(self, row: sqlite3.Row):
+        self.id: int = row['id']
+        self.title: str = row['title']
+        self.description: Optional[str] = row['description']
+        self.table_name: Optional[str] = row['table_name']
+        self.created_at: str = row['created_at']
+        self.field_names: Tuple[str, ...] = tuple(f['original_name'] for f in json.loads(row['custom_fields']))
+        # 表頭順序：固定欄位、自訂欄位（依照創建順序）、提交時間
+        self.headers: List[str] = (
+            [SUBMISSION_HEADER_MAP[col] for col in ('name', 'email', 'phone')]
+            + list(self.field_names)
+            + [SUBMISSION_HEADER_MAP['timestamp']]
+        )
+
+    def __getitem__(self, key: str):
+        return getattr(self, key)
+
+
+class FormDefinitionCache:
+    """
+    表單 ID -> FormDefinition 的 LRU 快取。表單新增或刪除時呼叫 invalidate；
+    其他行程的刪除透過 page_cache_invalidations（endpoint 為 form_dynamic）同步。
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[int, FormDefinition]' = OrderedDict()
+        self._lock = threading.Lock()
+        # 與 PageCache 相同：讀取資料庫期間若有失效發生，讀到的結果不寫入快取
+        self.generation = 0
+
+    def get(self, form_id: int) -> Optional[FormDefinition]:
+        with self._lock:
+            form = self._entries.get(form_id)
+            if form is not None:
+                self._entries.move_to_end(form_id)
+                return form
+            generation = self.generation
+
+        row = get_db_connection().execute('SELECT * FROM forms WHERE id = ?', (form_id,)).fetchone()
+        if row is None:
+            return None
+        form = FormDefinition(row)
+        with self._lock:
+            if generation == self.generation:
+                self._entries[form_id] = form
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return form
+
+    def invalidate(self, form_id: Optional[int] = None) -> None:
+        """清除指定表單；未指定時全部清除。"""
+        with self._lock:
+            self.generation += 1
+            if form_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(form_id, None)
+
+
+form_cache = FormDefinitionCache(app.config['FORM_CACHE_SIZE'])
+
+
+def get_form_by_id(form_id: int) -> Optional[FormDefinition]:
+    """根據 ID 取得單一表單（已解析的快取定義）。"""
+    sync_page_cache()
+    return form_cache.get(form_id)
+
+
+def invalidate_form(form_id: int) -> None:
+    """表單新增或刪除後清除本行程與其他 worker 行程的表單快取。"""
+    form_cache.invalidate(form_id)
+    invalidate_page('form_dynamic', form_id=form_id)
+
+
+def create_form_record(title: str, description: str, custom_fields_data: List[Dict[str, str]]) -> int:
+    """
+    新增表單定義並回傳表單 ID。所有表單的提交記錄共用 form_submissions 資料表。
+    """
+    with get_db_connection() as conn:
+        custom_fields_json = json.dumps(custom_fields_data)
+        tz = pytz.timezone('Asia/Taipei')
+        created_at: str = datetime.now(tz).strftime('%Y-%m-%d %H:%M:%S')
+
+        cursor = conn.execute(
+            'INSERT INTO forms (title, description, custom_fields, table_name, created_at) VALUES (?, ?, ?, ?, ?)',
+            (title, description, custom_fields_json, SUBMISSIONS_TABLE, created_at)
+        )
+    invalidate_form(cursor.lastrowid)
+    return cursor.lastrowid
+
+
+def delete_form_and_submissions(form_id: int) -> bool:
+    """刪除表單及其所有提交記錄。"""
+    form = get_form_by_id(form_id)
+    if not form:
+        return False
+
+    with get_db_connection() as conn:
+        conn.execute(f'DELETE FROM {SUBMISSIONS_TABLE} WHERE form_id = ?', (form_id,))
+        conn.execute('DELETE FROM forms WHERE id = ?', (form_id,))
+    invalidate_form(form_id)
+    return True
+
+
+_TAIPEI = pytz.timezone('Asia/Taipei')
+
+
+def _build_submission_row(form: FormDefinition, form_data: Dict[str, any]) -> tuple:
+    """依表單定義整理出要寫入 form_submissions 的欄位值。"""
+    fields = {name: form_data.get(name, '') for name in form.field_names}
+    return (
+        form.id, form_data['name'], form_data['email'], form_data['phone'],
+        json.dumps(fields, ensure_ascii=False), datetime.now(_TAIPEI).strftime('%Y-%m-%d %H:%M:%S')
+    )
+
+
+def save_submission(form: FormDefinition, form_data: Dict[str, any]) -> None:
+    """
+    儲存一筆表單提交記錄。
+    SUBMISSION_INGEST_MODE 為 'journal' 時先寫入本機日誌即回覆，再由背景執行緒批次寫入資料庫。
+    """
+    row = _build_submission_row(form, form_data)
+    if app.config['SUBMISSION_INGEST_MODE'] == 'journal':
+        submission_ingestor.submit(row)
+        return
+
     with get_db_connection() as conn:
-        return conn.execute('SELECT * FROM forms WHERE id = ?', (form_id,)).fetchone()
+        conn.execute(SUBMISSION_INSERT_SQL, row)
 
 
-def create_form_and_table(title: str, description: str, custom_fields_data: List[Dict[str, str]]) -> None:
+class SubmissionIngestor:
     """
-    以交易方式創建新表單及其對應的提交資料表。
-    確保所有操作要麼全部成功，要麼全部失敗。
+    表單提交的預寫日誌與批次寫入器。
+
+    submit 會把記錄附加到本行程專屬的日誌檔並 fsync 後才返回（多個執行緒共用同一次 fsync），
+    背景執行緒再把累積的記錄以單一交易寫入 form_submissions，並在同一交易更新 ingest_checkpoints。
+    啟動時會重播已結束行程留下的日誌中尚未寫入的記錄。
     """
-    with get_db_connection() as conn:
-        custom_fields_json = json.dumps(custom_fields_data)
-        tz = pytz.timezone('Asia/Taipei')
-        created_at: str = datetime.now(tz).strftime('%Y-%m-%d %H:%M:%S')
 
-        # 步驟 1: 插入表單元數據
-        cursor = conn.execute(
-            'INSERT INTO forms (title, description, custom_fields, created_at) VALUES (?, ?, ?, ?)',
-            (title, description, custom_fields_json, created_at)
-        )
-        form_id = cursor.lastrowid
-        table_name = f"form_submissions_{form_id}"
-
-        # 步驟 2: 更新 table_name
-        conn.execute('UPDATE forms SET table_name = ? WHERE id = ?', (table_name, form_id))
-
-        # 步驟 3: 動態建立提交記錄資料表
-        columns = [
-            "id INTEGER PRIMARY KEY AUTOINCREMENT",
-            "name TEXT NOT NULL", "email TEXT NOT NULL", "phone TEXT NOT NULL",
-            "timestamp TEXT NOT NULL"
-        ]
-        # 由於 sanitize_column_name 函式已被移除，這裡直接使用原始名稱，這可能導致問題
-        columns.extend(f'"{field["original_name"]}" TEXT' for field in custom_fields_data)
-        conn.execute(f"CREATE TABLE {table_name} ({', '.join(columns)});")
+    # journal-<pid>-<亂數>.log，重播中的日誌再加上 .claimed-<重播行程的 pid>
+    JOURNAL_RE = re.compile(r'(journal-(\d+)(?:-[0-9a-f]+)?\.log)(?:\.claimed-(\d+))?')
+
+    def __init__(self, journal_dir: str, batch_size: int, flush_interval: float):
+        self.journal_dir = journal_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._start_lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._journal_name = ''
+
+    @property
+    def journal_path(self) -> str:
+        return os.path.join(self.journal_dir, self._journal_name)
+
+    def start(self) -> None:
+        """重播遺留日誌並啟動背景寫入執行緒；fork 之後的子行程會各自重新啟動。"""
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            os.makedirs(self.journal_dir, exist_ok=True)
+            self._write_lock = threading.Lock()
+            self._sync_lock = threading.Lock()
+            self._wakeup = threading.Event()
+            self._stopping = threading.Event()
+            self._pending: 'deque[Tuple[int, tuple]]' = deque()
+            self._apply_lock = threading.Lock()
+
+            self._recover()
+            # 每次啟動都用新的日誌名稱，pid 重複使用時也不會和舊日誌或其 checkpoint 混在一起
+            self._journal_name = f'journal-{os.getpid()}-{secrets.token_hex(4)}.log'
+            self._seq = self._synced = 0
+            self._file = open(self.journal_path, 'ab')
+            self._thread = threading.Thread(target=self._run, name='submission-ingest', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+        atexit.register(self.stop)
+
+    def submit(self, row: tuple) -> None:
+        """寫入日誌並等到資料落盤後返回。"""
+        if self._pid != os.getpid():
+            self.start()
+
+        with self._write_lock:
+            self._seq += 1
+            seq = self._seq
+            self._file.write((json.dumps([seq, *row], ensure_ascii=False) + '\n').encode('utf-8'))
+            self._file.flush()
+            self._pending.append((seq, row))
+
+        # group commit：排隊等 fsync 的執行緒若發現自己的記錄已被前一次 fsync 涵蓋就直接返回
+        with self._sync_lock:
+            if self._synced < seq:
+                with self._write_lock:
+                    target = self._seq
+                os.fsync(self._file.fileno())
+                self._synced = target
+
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self) -> None:
+        """把目前累積的記錄立即寫入資料庫（測試與關閉時使用）。"""
+        while self._pending:
+            self._write_batch()
+
+    def stop(self) -> None:
+        if self._pid != os.getpid():
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._pid = None
+        if not self._pending:
+            self._file.close()
+            self._discard(self._journal_name, self.journal_path)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"批次寫入提交記錄失敗，稍後重試: {e}")
+        self.flush()
+
+    def _write_batch(self) -> None:
+        # 批次必須依序寫入，checkpoint 才不會倒退
+        with self._apply_lock:
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                batch.append(self._pending.popleft())
+            if not batch:
+                return
+            try:
+                self._apply(self._journal_name, batch)
+            except sqlite3.Error:
+                self._pending.extendleft(reversed(batch))
+                raise
+
+            # 全部寫入資料庫後清空日誌，避免檔案無限成長
+            with self._write_lock:
+                if not self._pending and batch[-1][0] == self._seq:
+                    self._file.truncate(0)
+
+    @staticmethod
+    def _apply(journal: str, batch: List[Tuple[int, tuple]]) -> None:
+        with get_db_connection() as conn:
+            conn.executemany(SUBMISSION_INSERT_SQL, [row for _, row in batch])
+            conn.execute(
+                'INSERT INTO ingest_checkpoints (journal, seq) VALUES (?, ?) '
+                'ON CONFLICT(journal) DO UPDATE SET seq = excluded.seq',
+                (journal, batch[-1][0])
+            )
 
-        conn.commit()
+    def _recover(self) -> None:
+        """
+        重播已結束行程留下的日誌。先以 rename 把日誌改成本行程認領的檔名再重播：
+        多個 worker 同時啟動時只有改名成功的行程會重播，不會重複寫入。
+        """
+        for name in sorted(os.listdir(self.journal_dir)):
+            match = self.JOURNAL_RE.fullmatch(name)
+            if not match:
+                continue
+            journal, owner = match.group(1), int(match.group(3) or match.group(2))
+            # 本行程的日誌還沒建立，同 pid 的檔案一定是已結束的舊行程留下的
+            if owner != os.getpid() and _pid_alive(owner):
+                continue
+
+            path = os.path.join(self.journal_dir, f'{journal}.claimed-{os.getpid()}')
+            try:
+                os.rename(os.path.join(self.journal_dir, name), path)
+            except FileNotFoundError:
+                continue  # 已被其他行程認領
+            self._replay(journal, path)
+
+    def _replay(self, journal: str, path: str) -> None:
+        with get_db_connection() as conn:
+            row = conn.execute('SELECT seq FROM ingest_checkpoints WHERE journal = ?', (journal,)).fetchone()
+        checkpoint = row['seq'] if row else 0
+
+        batch = []
+        replayed = False
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    seq, *values = json.loads(line)
+                except ValueError:
+                    break  # 寫到一半就中斷的最後一行
+                if seq > checkpoint:
+                    batch.append((seq, tuple(values)))
+                if len(batch) >= self.batch_size:
+                    self._apply(journal, batch)
+                    batch, replayed = [], True
+        if batch:
+            self._apply(journal, batch)
+            replayed = True
+        if replayed:
+            print(f"已從 {journal} 重播尚未寫入的提交記錄")
+        self._discard(journal, path)
+
+    @staticmethod
+    def _discard(journal: str, path: str) -> None:
+        """刪除已全部寫入資料庫的日誌；日誌名稱不會再被使用，checkpoint 也一併刪除。"""
+        os.remove(path)
+        with get_db_connection() as conn:
+            conn.execute('DELETE FROM ingest_checkpoints WHERE journal = ?', (journal,))
 
 
-def delete_form_and_table(form_id: int) -> bool:
-    """刪除表單及其對應的提交資料表。"""
-    form = get_form_by_id(form_id)
-    if not form or not form['table_name']:
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
         return False
-
-    with get_db_connection() as conn:
-        conn.execute(f"DROP TABLE IF EXISTS {form['table_name']}")
-        conn.execute('DELETE FROM forms WHERE id = ?', (form_id,))
-        conn.commit()
+    except PermissionError:
+        return True
     return True
 
 
-def save_submission(form: sqlite3.Row, form_data: Dict[str, any]) -> None:
-    """儲存一筆表單提交記錄。"""
-    custom_fields = json.loads(form['custom_fields'])
-    tz = pytz.timezone('Asia/Taipei')
+submission_ingestor = SubmissionIngestor(
+    app.config['SUBMISSION_JOURNAL_DIR'],
+    app.config['SUBMISSION_BATCH_SIZE'],
+    app.config['SUBMISSION_FLUSH_INTERVAL']
+)
 
-    columns = ['name', 'email', 'phone', 'timestamp']
-    values = [
-        form_data['name'], form_data['email'], form_data['phone'],
-        datetime.now(tz).strftime('%Y-%m-%d %H:%M:%S')
-    ]
-
-    for field in custom_fields:
-        # 由於 sanitize_column_name 函式已被移除，這裡直接使用原始名稱，這可能導致問題
-        columns.append(f'"{field["original_name"]}"')
-        values.append(form_data.get(field['original_name'], ''))
 
-    placeholders = ', '.join(['?'] * len(values))
-    sql = f"INSERT INTO {form['table_name']} ({', '.join(columns)}) VALUES ({placeholders})"
-
-    with get_db_connection() as conn:
-        conn.execute(sql, tuple(values))
-        conn.commit()
+def _submission_row(row: sqlite3.Row, custom_names: Tuple[str, ...]) -> List[any]:
+    """把一筆 form_submissions 資料列展開成與表頭對齊的清單。"""
+    fields = json.loads(row['fields'])
+    return (
+        [row['name'], row['email'], row['phone']]
+        + [fields.get(name, '') for name in custom_names]
+        + [row['timestamp']]
+    )
 
 
-def get_submissions_with_ordered_headers(form_id: int) -> Tuple[List[str], List[List[any]]]:
-    """取得特定表單的提交記錄，並回傳排序好的表頭和資料。"""
+def get_submissions_with_ordered_headers(
+    form_id: int, before_id: Optional[int] = None, per_page: Optional[int] = None
+) -> Tuple[List[str], List[List[any]], Optional[int]]:
+    """
+    取得特定表單的提交記錄，並回傳排序好的表頭、資料與下一頁游標。
+    有給 per_page 時以 id 為游標分頁；沒有下一頁時游標為 None。
+    """
     form = get_form_by_id(form_id)
-    if not form or not form['table_name']:
-        return [], []
+    if not form:
+        return [], [], None
 
-    with get_db_connection() as conn:
-        # 1. 取得資料庫中實際存在的欄位
-        cursor = conn.execute(f"PRAGMA table_info({form['table_name']})")
-        db_columns = {row['name'] for row in cursor}
-
-        # 2. 定義欄位順序和顯示名稱
-        header_map = {'name': '姓名', 'email': '電子郵件', 'phone': '手機號碼', 'timestamp': '提交時間'}
-        # 由於 sanitize_column_name 函式已被移除，這裡直接使用原始名稱，這可能導致問題
-        custom_fields_map = {f['original_name']: f['original_name'] for f in json.loads(form['custom_fields'])}
-
-        # 依序建立最終要查詢的欄位和顯示的表頭
-        query_cols, display_headers = [], []
+    # 沒有游標或不分頁時以極大值代替，讓所有情況共用同一條 SQL
+    rows = get_db_connection().execute(
+        SUBMISSION_PAGE_SQL, (form_id, before_id or sys.maxsize, per_page + 1 if per_page else -1)
+    ).fetchall()
 
-        # 標準欄位
-        for col in ['name', 'email', 'phone']:
-            if col in db_columns:
-                query_cols.append(f'"{col}"')
-                display_headers.append(header_map[col])
+    next_cursor = None
+    if per_page and len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = rows[-1]['id']
+    return form.headers, [_submission_row(row, form.field_names) for row in rows], next_cursor
 
-        # 自訂欄位 (依照創建順序)
-        for san_name, org_name in custom_fields_map.items():
-                if san_name in db_columns:
-                    query_cols.append(f'"{san_name}"')
-                    display_headers.append(org_name)
 
-        # 時間戳欄位
-        if 'timestamp' in db_columns:
-            query_cols.append('"timestamp"')
-            display_headers.append(header_map['timestamp'])
+def iter_submission_rows(form: FormDefinition):
+    """
+    逐筆產生表單提交記錄（由舊到新），直接走資料庫游標，不會一次載入全部資料。
+    """
+    cursor = get_db_connection().execute(SUBMISSION_EXPORT_SQL, (form.id,))
+    for row in cursor:
+        yield _submission_row(row, form.field_names)
 
-        # 3. 查詢資料
-        if not query_cols:
-            return [], []
 
-        sql = f'SELECT {", ".join(query_cols)} FROM {form["table_name"]} ORDER BY id DESC'
-        rows = conn.execute(sql).fetchall()
-        submissions_data = [list(row) for row in rows]
+def get_submission_analytics(form: FormDefinition, granularity: str = 'day', top_values: int = 20) -> Dict[str, any]:
+    """
+    由統計表組出表單的提交統計：每日或每小時的提交數，以及各自訂欄位出現最多的 top_values 個值
+    （其餘合計為 other）。只讀取統計表，不掃描 form_submissions。
+    """
+    conn = get_db_connection()
+    width = 13 if granularity == 'hour' else 10
+    timeline = [
+        {'bucket': row['bucket'] + (':00' if granularity == 'hour' else ''), 'count': row['count']}
+        for row in conn.execute(
+            'SELECT substr(hour, 1, ?) AS bucket, sum(count) AS count FROM submission_hourly_counts'
+            ' WHERE form_id = ? GROUP BY bucket ORDER BY bucket',
+            (width, form.id)
+        )
+    ]
 
-        return display_headers, submissions_data
+    fields = {name: {'name': name, 'values': [], 'other': 0, 'distinct': 0} for name in form.field_names}
+    for row in conn.execute('''
+        SELECT field, value, count, total, distinct_values FROM (
+            SELECT field, value, count,
+                   row_number() OVER (PARTITION BY field ORDER BY count DESC, value) AS rank,
+                   sum(count) OVER (PARTITION BY field) AS total,
+                   count(*) OVER (PARTITION BY field) AS distinct_values
+            FROM submission_value_counts WHERE form_id = ?
+        ) WHERE rank <= ? ORDER BY field, rank
+    ''', (form.id, top_values)):
+        field = fields.get(row['field'])
+        if field is None:  # 欄位已不在表單定義中
+            continue
+        field['values'].append({'value': row['value'], 'count': row['count']})
+        field['distinct'] = row['distinct_values']
+        field['other'] = row['total'] - sum(v['count'] for v in field['values'])
+
+    return {
+        'form_id': form.id,
+        'title': form.title,
+        'granularity': 'hour' if granularity == 'hour' else 'day',
+        'total': sum(point['count'] for point in timeline),
+        'timeline': timeline,
+        'fields': list(fields.values()),
+    }
+
+
+def _csv_export(headers: List[str], rows):
+    """以串流方式產生 CSV；開頭加上 BOM 讓 Excel 正確辨識 UTF-8 中文。"""
+    buffer = io.StringIO()
+    buffer.write('\ufeff')
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % 500 == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _xlsx_export(headers: List[str], rows):
+    """以 openpyxl 的 write-only 模式寫入暫存檔後分段送出，記憶體用量不隨資料量成長。"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(row)
+
+    with tempfile.TemporaryFile() as tmp:
+        workbook.save(tmp)
+        tmp.seek(0)
+        for chunk in iter(lambda: tmp.read(64 * 1024), b''):
+            yield chunk
 
 
 @app.route('/')
+@cached_page
 def index():
     """
     首頁，顯示最新三則公告。
     """
-    try:
-        conn = get_db_connection()
-        announcements = conn.execute(
-            'SELECT * FROM announcements ORDER BY id DESC LIMIT 3'
-        ).fetchall()
-    finally:
-        conn.close()
+    announcements, _ = announcement_feed.page(None, 3)
     return render_template('index.html', announcements=announcements)
 
 
 @app.route('/member')
+@cached_page
 def member():
     """
     奉祀神祇頁
@@ -274,6 +2872,7 @@ def member():
 
 
 @app.route('/history')
+@cached_page
 def history():
     """
     神明故事頁
@@ -282,6 +2881,7 @@ def history():
 
 
 @app.route('/event')
+@cached_page
 def event():
     """
     廟宇沿革頁
@@ -290,6 +2890,7 @@ def event():
 
 
 @app.route('/light')
+@cached_page
 def light():
     """
     安奉斗燈頁
@@ -298,6 +2899,7 @@ def light():
 
 
 @app.route('/solve')
+@cached_page
 def solve():
     """
     收驚問事頁
@@ -306,37 +2908,57 @@ def solve():
 
 
 @app.route('/announcements')
+@cached_page
 def announcement_list():
     """
     公告列表頁面。
     """
-    try:
-        conn = get_db_connection()
-        announcements = conn.execute(
-            'SELECT * FROM announcements ORDER BY id DESC'
-        ).fetchall()
-    finally:
-        conn.close()
-    return render_template('announcements.html', announcements=announcements)
+    before_id = request.args.get('before', type=int)
+    announcements, next_cursor = announcement_feed.page(before_id, app.config['ANNOUNCEMENTS_PER_PAGE'])
+    return render_template(
+        'announcements.html',
+        announcements=announcements,
+        next_cursor=next_cursor,
+        is_first_page=not before_id
+    )
+
+
+@app.route('/announcements/search')
+@cached_page
+def announcement_search():
+    """
+    公告全文搜尋。
+    """
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    results, has_next = search_announcements(query, page, app.config['SEARCH_RESULTS_PER_PAGE'])
+    return render_template(
+        'announcement_search.html',
+        query=query,
+        results=results,
+        page=page,
+        has_next=has_next
+    )
 
 
 @app.route('/announcements/<int:announcement_id>')
+@cached_page
 def announcement_detail(announcement_id: int):
     """
     公告詳情頁。
     """
-    try:
-        conn = get_db_connection()
-        announcement = conn.execute(
-            'SELECT * FROM announcements WHERE id = ?',
-            (announcement_id,)
-        ).fetchone()
-        images = conn.execute(
-            'SELECT * FROM images WHERE announcement_id = ?',
-            (announcement_id,)
-        ).fetchall()
-    finally:
-        conn.close()
+    conn = get_db_connection()
+    now = schedule_now()
+    announcement = conn.execute(
+        f'SELECT * FROM announcements WHERE id = ? AND {ANNOUNCEMENT_VISIBLE_SQL}',
+        (announcement_id, now, now)
+    ).fetchone()
+    if announcement is None:
+        abort(404)
+    images = conn.execute(
+        'SELECT * FROM images WHERE announcement_id = ?',
+        (announcement_id,)
+    ).fetchall()
     return render_template('announcement_detail.html', announcement=announcement, images=images)
 
 
@@ -346,14 +2968,15 @@ def admin_announcements():
     """
     管理頁面，顯示所有公告。
     """
-    try:
-        conn = get_db_connection()
-        announcements = conn.execute(
-            'SELECT * FROM announcements ORDER BY id DESC'
-        ).fetchall()
-    finally:
-        conn.close()
-    return render_template('admin_announcements.html', announcements=announcements)
+    before_id = request.args.get('before', type=int)
+    announcements, next_cursor = get_announcement_page(before_id, app.config['ANNOUNCEMENTS_PER_PAGE'])
+    return render_template(
+        'admin_announcements.html',
+        announcements=announcements,
+        next_cursor=next_cursor,
+        is_first_page=not before_id,
+        now=schedule_now()
+    )
 
 
 @app.route('/admin_announcements/create_announcements', methods=['GET', 'POST'])
@@ -367,62 +2990,174 @@ def create_announcements():
         content: str = request.form['content']
         image = request.files.get('image')
         images = request.files.getlist('images')
+        publish_at = parse_schedule(request.form.get('publish_at'))
+        expire_at = parse_schedule(request.form.get('expire_at'))
         tz = pytz.timezone('Asia/Taipei')
-        timestamp: str = datetime.now(tz).strftime('%Y-%m-%d')
+        # 排程上架的公告以上架日期作為公告日期
+        timestamp: str = publish_at[:10] if publish_at else datetime.now(tz).strftime('%Y-%m-%d')
 
-        image_filename: Optional[str] = None
+        saved_cover: Optional[str] = None
         if image and image.filename:
-            filename = secure_filename(image.filename)
-            image_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            image.save(image_path)
-            image_filename = filename
+            saved_cover = upload_store.save(image)
 
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                'INSERT INTO announcements (title, content, image, timestamp) VALUES (?, ?, ?, ?)',
-                (title, content, image_filename, timestamp)
-            )
-            announcement_id = cursor.lastrowid
-
-            for img in images:
-                if img and img.filename:
-                    img_name = secure_filename(img.filename)
-                    img_path = os.path.join(app.config['UPLOAD_FOLDER'], img_name)
-                    img.save(img_path)
-                    cursor.execute(
-                        'INSERT INTO images (announcement_id, filename) VALUES (?, ?)',
-                        (announcement_id, img_name)
-                    )
-            conn.commit()
+            with get_db_connection() as conn:
+                image_filename = _take_cover_image(conn, saved_cover, request.form.get('cover_upload_id'))
+                cursor = conn.cursor()
+                cursor.execute(
+                    'INSERT INTO announcements (title, content, image, timestamp, excerpt, publish_at, expire_at)'
+                    ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (title, content, image_filename, timestamp, make_excerpt(content), publish_at, expire_at)
+                )
+                announcement_id = cursor.lastrowid
+                variant_jobs = []
+                if image_filename:
+                    variant_jobs.append(('announcements', announcement_id, image_filename))
+
+                variant_jobs += _attach_images(conn, announcement_id, images, request.form.getlist('upload_ids'))
+            schedule_image_variants(variant_jobs, announcement_id)
         except sqlite3.Error as e:
             print(f"資料庫錯誤: {e}")
-        finally:
-            conn.close()
+        invalidate_announcement_pages()
 
         return redirect(url_for('admin_announcements'))
 
     return render_template('create_announcements.html')
 
 
+@app.route('/admin_uploads', methods=['POST'])
+@login_required
+def create_upload():
+    """
+    建立分段上傳工作。請求內容為 JSON：{"filename": 原始檔名, "size": 位元組數}。
+    """
+    data = request.get_json(silent=True) or {}
+    filename = str(data.get('filename') or '')
+    try:
+        size = int(data.get('size'))
+    except (TypeError, ValueError):
+        size = 0
+    if not filename or not 0 < size <= app.config['UPLOAD_MAX_SIZE']:
+        return jsonify(error='檔名或檔案大小不正確'), 400
+
+    with get_db_connection() as conn:
+        upload_id = chunked_uploads.create(conn, filename, size)
+    return jsonify(
+        upload_id=upload_id, size=size, received=0, complete=False,
+        chunk_size=app.config['UPLOAD_CHUNK_SIZE']
+    ), 201
+
+
+def _upload_status(upload: sqlite3.Row):
+    return jsonify(
+        upload_id=upload['id'], size=upload['size'], received=upload['received'],
+        complete=upload['blob'] is not None
+    )
+
+
+@app.route('/admin_uploads/<upload_id>', methods=['GET'])
+@login_required
+def upload_status(upload_id: str):
+    """
+    查詢上傳進度，用戶端中斷後據此決定從哪個位置續傳。
+    """
+    upload = chunked_uploads.get(get_db_connection(), upload_id)
+    if upload is None:
+        return jsonify(error='上傳工作不存在或已過期'), 404
+    return _upload_status(upload)
+
+
+@app.route('/admin_uploads/<upload_id>', methods=['PUT'])
+@login_required
+def upload_chunk(upload_id: str):
+    """
+    寫入一段資料，請求內容為原始位元組。查詢參數 offset 必須等於已收到的位元組數，
+    否則回應 409 與目前進度，用戶端改從正確位置續傳。
+    """
+    conn = get_db_connection()
+    upload = chunked_uploads.get(conn, upload_id)
+    if upload is None:
+        return jsonify(error='上傳工作不存在或已過期'), 404
+    if upload['blob'] is not None or request.args.get('offset', type=int) != upload['received']:
+        return _upload_status(upload), 409
+    if (request.content_length or 0) > app.config['UPLOAD_CHUNK_SIZE']:
+        return jsonify(error='分段過大'), 413
+
+    try:
+        received = chunked_uploads.write_chunk(conn, upload, request.stream)
+    except ValueError as e:
+        return jsonify(error=str(e)), 413
+    except OSError as e:
+        print(f"分段寫入失敗: {e}")
+        return jsonify(error='分段寫入失敗'), 500
+    upload = chunked_uploads.get(conn, upload_id)
+    return _upload_status(upload), 200 if received is not None else 409
+
+
+@app.route('/admin_announcements/export')
+@login_required
+def export_announcements():
+    """下載所有公告與圖片的 zip 備份（串流產生）。"""
+    filename = quote(f"公告備份_{datetime.now(_TAIPEI).strftime('%Y%m%d')}.zip")
+    return Response(
+        stream_with_context(export_announcements_archive()),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f"attachment; filename*=UTF-8''{filename}"}
+    )
+
+
+@app.route('/admin_announcements/import', methods=['POST'])
+@login_required
+def import_announcements():
+    """
+    匯入 zip 備份（格式與匯出相同），回傳 JSON 匯入報告。
+    """
+    archive = request.files.get('archive')
+    if not archive or not archive.filename:
+        return jsonify(error='請選擇備份檔'), 400
+
+    fd, tmp_path = tempfile.mkstemp(suffix='.zip')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            shutil.copyfileobj(archive.stream, out, ContentAddressedStore.CHUNK_SIZE)
+        report = import_announcements_archive(tmp_path)
+    except (zipfile.BadZipFile, KeyError) as e:
+        return jsonify(error=f'備份檔格式不正確: {e}'), 400
+    except sqlite3.Error as e:
+        print(f"公告匯入失敗: {e}")
+        return jsonify(error='公告匯入失敗'), 500
+    finally:
+        os.remove(tmp_path)
+    return jsonify(report)
+
+
 @app.route('/admin_announcements/delete/<int:announcement_id>')
 @login_required
 def delete(announcement_id: int):
     """
     刪除公告。
     """
+    removable = []
     try:
-        conn = get_db_connection()
-        conn.execute(
-            'DELETE FROM announcements WHERE id = ?',
-            (announcement_id,)
-        )
-        conn.commit()
+        with get_db_connection() as conn:
+            cover = conn.execute('SELECT image FROM announcements WHERE id = ?', (announcement_id,)).fetchone()
+            filenames = [row['filename'] for row in conn.execute(
+                'SELECT filename FROM images WHERE announcement_id = ?', (announcement_id,)
+            )]
+            if cover and cover['image']:
+                filenames.append(cover['image'])
+
+            conn.execute('DELETE FROM images WHERE announcement_id = ?', (announcement_id,))
+            conn.execute(
+                'DELETE FROM announcements WHERE id = ?',
+                (announcement_id,)
+            )
+            removable = [name for name in filenames if upload_store.release(conn, name)]
+        for name in removable:
+            upload_store.remove(name)
     except sqlite3.Error as e:
         print(f"刪除失敗: {e}")
-    finally:
-        conn.close()
+    invalidate_announcement_pages(announcement_id)
     return redirect(url_for('admin_announcements'))
 
 
@@ -433,19 +3168,18 @@ def delete_image(image_id: int, announcement_id: int):
     刪除公告的一張附加圖片。
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        image = cursor.execute('SELECT filename FROM images WHERE id = ?', (image_id,)).fetchone()
-        if image:
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], image['filename'])
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            cursor.execute('DELETE FROM images WHERE id = ?', (image_id,))
-            conn.commit()
+        removable = False
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            image = cursor.execute('SELECT filename FROM images WHERE id = ?', (image_id,)).fetchone()
+            if image:
+                cursor.execute('DELETE FROM images WHERE id = ?', (image_id,))
+                removable = upload_store.release(conn, image['filename'])
+        if removable:
+            upload_store.remove(image['filename'])
     except sqlite3.Error as e:
         print(f"圖片刪除失敗: {e}")
-    finally:
-        conn.close()
+    invalidate_page('announcement_detail', announcement_id=announcement_id)
     return redirect(url_for('edit', announcement_id=announcement_id))
 
 
@@ -472,38 +3206,56 @@ def edit(announcement_id: int):
         content: str = request.form['content']
         image = request.files.get('image')
         new_images = request.files.getlist('images')
-
-        image_filename: str = announcement['image']
+        publish_at = parse_schedule(request.form.get('publish_at'))
+        timestamp: str = announcement['timestamp']
+        # 與新增公告相同：上架時間改變時，公告日期跟著改成新的上架日期
+        if publish_at != announcement['publish_at']:
+            tz = pytz.timezone('Asia/Taipei')
+            timestamp = publish_at[:10] if publish_at else datetime.now(tz).strftime('%Y-%m-%d')
+
+        old_image: Optional[str] = announcement['image']
+        image_filename: Optional[str] = old_image
+        image_variants: Optional[str] = announcement['image_variants']
+        variant_jobs = []
+        saved_cover: Optional[str] = None
         if image and image.filename:
-            filename = secure_filename(image.filename)
-            image.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-            image_filename = filename
+            saved_cover = upload_store.save(image)
 
         try:
-            conn.execute(
-                'UPDATE announcements SET title = ?, content = ?, image = ? WHERE id = ?',
-                (title, content, image_filename, announcement_id)
-            )
-
-            # 新增新上傳的多張圖片
-            for img in new_images:
-                if img and img.filename:
-                    img_name = secure_filename(img.filename)
-                    img_path = os.path.join(app.config['UPLOAD_FOLDER'], img_name)
-                    img.save(img_path)
+            removable = False
+            with conn:
+                new_cover = _take_cover_image(conn, saved_cover, request.form.get('cover_upload_id'))
+                if new_cover:
+                    image_filename = new_cover
+                    image_variants = None
+                    variant_jobs.append(('announcements', announcement_id, image_filename))
+                conn.execute(
+                    'UPDATE announcements SET title = ?, content = ?, image = ?, timestamp = ?, excerpt = ?,'
+                    ' image_variants = ?, publish_at = ?, expire_at = ? WHERE id = ?',
+                    (
+                        title, content, image_filename, timestamp, make_excerpt(content), image_variants,
+                        publish_at, parse_schedule(request.form.get('expire_at')), announcement_id
+                    )
+                )
+                if new_cover:
+                    # 舊封面的尺寸與預覽不適用，等背景工作算出新的
                     conn.execute(
-                        'INSERT INTO images (announcement_id, filename) VALUES (?, ?)',
-                        (announcement_id, img_name)
+                        'UPDATE announcements SET image_width = NULL, image_height = NULL, image_placeholder = NULL'
+                        ' WHERE id = ?', (announcement_id,)
                     )
-
-            conn.commit()
+                if new_cover and old_image:
+                    removable = upload_store.release(conn, old_image)
+
+                # 新增新上傳的多張圖片
+                variant_jobs += _attach_images(conn, announcement_id, new_images, request.form.getlist('upload_ids'))
+            if removable:
+                upload_store.remove(old_image)
+            schedule_image_variants(variant_jobs, announcement_id)
         except sqlite3.Error as e:
             print(f"更新失敗: {e}")
-        finally:
-            conn.close()
+        invalidate_announcement_pages(announcement_id)
         return redirect(url_for('admin_announcements'))
 
-    conn.close()
     return render_template('edit_announcement.html', announcement=announcement, other_images=other_images)
 
 
@@ -535,7 +3287,7 @@ def create_form():
             return render_template('create_form.html', **request.form)
 
         try:
-            create_form_and_table(title, description, fields_data)
+            create_form_record(title, description, fields_data)
         except sqlite3.Error:
             pass
 
@@ -549,7 +3301,7 @@ def create_form():
 def delete_form(form_id: int):
     """刪除表單及其提交記錄。"""
     try:
-        if delete_form_and_table(form_id):
+        if delete_form_and_submissions(form_id):
             pass
         else:
             pass
@@ -573,9 +3325,7 @@ def form_dynamic(form_id: int):
             save_submission(form, request.form)
             return redirect(url_for('form_submitted'))
 
-        custom_fields = json.loads(form['custom_fields'])
-        original_field_names = [field['original_name'] for field in custom_fields]
-        return render_template('form_dynamic.html', form=form, custom_fields=original_field_names)
+        return render_template('form_dynamic.html', form=form, custom_fields=form.field_names)
 
     except sqlite3.Error:
         return render_template('500.html'), 500
@@ -590,14 +3340,17 @@ def form_submitted():
 @app.route('/admin_form/form_submissions')
 @login_required
 def admin_form_submissions():
-    """後台顯示所有表單的提交記錄。"""
+    """後台分頁顯示表單的提交記錄。"""
     selected_form_id = request.args.get('form_id', type=int)
-    headers, submissions_data, forms = [], [], []
+    before_id = request.args.get('before', type=int)
+    headers, submissions_data, forms, next_cursor = [], [], [], None
 
     try:
         forms = get_all_forms()
         if selected_form_id:
-            headers, submissions_data = get_submissions_with_ordered_headers(selected_form_id)
+            headers, submissions_data, next_cursor = get_submissions_with_ordered_headers(
+                selected_form_id, before_id, app.config['SUBMISSIONS_PER_PAGE']
+            )
     except sqlite3.Error:
         pass
 
@@ -606,8 +3359,101 @@ def admin_form_submissions():
         submissions=submissions_data,
         forms=forms,
         selected_form_id=selected_form_id,
-        headers=headers
+        headers=headers,
+        next_cursor=next_cursor,
+        is_first_page=not before_id,
+        xlsx_available=Workbook is not None
+    )
+
+
+@app.route('/admin_form/form_submissions/export')
+@login_required
+def admin_form_submissions_export():
+    """以串流方式匯出表單的全部提交記錄（CSV 或 XLSX）。"""
+    form_id = request.args.get('form_id', type=int)
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'xlsx'):
+        export_format = 'csv'
+    form = get_form_by_id(form_id) if form_id else None
+    if not form:
+        return render_template('admin_error.html', message='找不到表單')
+
+    headers = form.headers
+    rows = iter_submission_rows(form)
+    filename = quote(f"{form['title']}_提交記錄.{export_format}")
+
+    if export_format == 'xlsx':
+        if Workbook is None:
+            return render_template('admin_error.html', message='伺服器未安裝 openpyxl，無法匯出 XLSX')
+        body = _xlsx_export(headers, rows)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        body = _csv_export(headers, rows)
+        mimetype = 'text/csv'
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f"attachment; filename*=UTF-8''{filename}"}
+    )
+
+
+@app.route('/admin_form/<int:form_id>/analytics')
+@login_required
+def admin_form_analytics(form_id: int):
+    """表單提交統計頁面。"""
+    form = get_form_by_id(form_id)
+    if not form:
+        return render_template('admin_error.html', message='找不到表單')
+    analytics = get_submission_analytics(form, request.args.get('granularity', 'day'))
+    return render_template('admin_form_analytics.html', form=form, analytics=analytics)
+
+
+@app.route('/admin_form/<int:form_id>/analytics.json')
+@login_required
+def admin_form_analytics_json(form_id: int):
+    """表單提交統計（JSON）。查詢參數 granularity 為 day 或 hour，top 為每個欄位列出的值數量。"""
+    form = get_form_by_id(form_id)
+    if not form:
+        return jsonify(error='找不到表單'), 404
+    top_values = max(1, min(request.args.get('top', 20, type=int), 500))
+    return jsonify(get_submission_analytics(form, request.args.get('granularity', 'day'), top_values))
+
+
+def metrics_access_allowed() -> bool:
+    """已登入的管理員、帶著正確 METRICS_TOKEN 或來自允許 IP 的請求才能讀取 /metrics。"""
+    if session.get('logged_in'):
+        return True
+    token = app.config['METRICS_TOKEN']
+    auth = request.headers.get('Authorization', '')
+    if token and auth.startswith('Bearer ') and secrets.compare_digest(auth[7:].encode(), token.encode()):
+        return True
+    return request.remote_addr in app.config['METRICS_ALLOWED_IPS']
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """
+    Prometheus 格式的效能指標
+    """
+    if not metrics_access_allowed():
+        return '', 403
+    body = metrics.render() + ''.join(
+        f'# TYPE {prefix}_{name} {"counter" if name in ("hits", "misses", "evictions") else "gauge"}\n'
+        f'{prefix}_{name} {value}\n'
+        for prefix, cache in (('page_cache', page_cache), ('compressed_body_cache', compressed_bodies))
+        for name, value in cache.stats().items()
     )
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/admin_cache_stats')
+@login_required
+def admin_cache_stats():
+    """
+    頁面快取與壓縮結果快取的命中統計（JSON）
+    """
+    return {**page_cache.stats(), 'compressed_bodies': compressed_bodies.stats()}
 
 
 @app.route('/admin')
@@ -630,20 +3476,28 @@ def admin_login():
         if not account or not password:
             return render_template('admin_error.html', message='請輸入帳號和密碼')
 
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT iid, username FROM members WHERE account = ? AND password = ?', (account, password))
-            row = cursor.fetchone()
-            if not row:
-                return render_template('admin_error.html', message='帳號或密碼錯誤')
-
-            iid, username = row['iid'], row['username']
-            session['logged_in'] = True
-            session['username'] = username
-            session['iid'] = iid
-            session.permanent = True
-
-            return redirect(url_for('admin_welcome'))
+        # 在查詢資料庫與計算雜湊之前先限流
+        wait = max(login_ip_limiter.consume(request.remote_addr or ''), login_account_limiter.consume(account))
+        if wait:
+            metrics.inc('login_rate_limited_total')
+            response = make_response(render_template('admin_error.html', message='嘗試次數過多，請稍後再試'), 429)
+            response.headers['Retry-After'] = str(int(wait) + 1)
+            return response
+
+        row = verify_member_password(get_db_connection(), account, password)
+        if not row:
+            return render_template('admin_error.html', message='帳號或密碼錯誤')
+
+        login_account_limiter.reset(account)
+        iid, username = row['iid'], row['username']
+        session.clear()
+        session.regenerate()
+        session['logged_in'] = True
+        session['username'] = username
+        session['iid'] = iid
+        session.permanent = True
+
+        return redirect(url_for('admin_welcome'))
 
     return render_template('admin_login.html')
 
@@ -665,9 +3519,7 @@ def logout():
     後臺登出
     """
     session.clear()
-    response = make_response(redirect(url_for('admin_login')))
-    response.delete_cookie(current_app.config['SESSION_COOKIE_NAME'])
-    return response
+    return redirect(url_for('admin_login'))
 
 @app.route('/edit_profile/<int:iid>', methods=['GET', 'POST'])
 @login_required
@@ -681,18 +3533,25 @@ def admin_edit_profile(iid: int):
             account = request.form.get('account')
             password = request.form.get('password')
 
-            if not account or not password:
-                return render_template('admin_error.html', message='請輸入帳號和密碼')
+            if not account:
+                return render_template('admin_error.html', message='請輸入帳號')
 
             cursor.execute('SELECT * FROM members WHERE account = ? AND iid != ?', (account, iid))
             if cursor.fetchone():
                 return render_template('admin_error.html', message='帳號已被使用')
 
-            cursor.execute('''
-                UPDATE members SET account = ?, password = ?
-                WHERE iid = ?
-            ''', (account, password, iid))
+            # 密碼欄位留空表示不變更
+            if password:
+                cursor.execute('''
+                    UPDATE members SET account = ?, password = ?
+                    WHERE iid = ?
+                ''', (account, hash_password(password), iid))
+            else:
+                cursor.execute('UPDATE members SET account = ? WHERE iid = ?', (account, iid))
             conn.commit()
+            if password:
+                # 改密碼後讓該管理員其他裝置上的登入失效
+                session_store.revoke_member(iid, keep_sid=session.sid)
             cursor.execute('SELECT username FROM members WHERE iid = ?', (iid,))
             username = cursor.fetchone()['username']
             return render_template('admin_welcome.html', username=username, iid=iid)
@@ -714,19 +3573,684 @@ def admin_delete_user(iid: int):
         cursor = conn.cursor()
         cursor.execute('DELETE FROM members WHERE iid = ?', (iid,))
         conn.commit()
+    session_store.revoke_member(iid)
     return redirect(url_for('admin'))
 
 
-init_db()
+_startup_lock = threading.Lock()
+_started_pid: Optional[int] = None
+
+
+def create_app(start_ingestor: bool = True) -> Flask:
+    """
+    啟動流程：初始化資料庫結構、把所有樣板預先編譯進位元組碼快取，並為連線暖機。
+    同一個行程只會執行一次；fork 出來的 worker 會在自己的行程內重新執行（結構已是最新版時很快）。
+    start_ingestor 為 False 時不啟動提交日誌寫入器（gunicorn preload 的 master 行程不處理請求）。
+    """
+    global _started_pid
+    with _startup_lock:
+        if _started_pid == os.getpid():
+            return app
+
+        init_db()
+        asset_pipeline.ensure_built()
+
+        os.makedirs(app.config['TEMPLATE_BYTECODE_CACHE_DIR'], exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['TEMPLATE_BYTECODE_CACHE_DIR'])
+        for name in app.jinja_env.list_templates(extensions=['html']):
+            app.jinja_env.get_template(name)
+
+        conn = get_db_connection()
+        conn.execute('SELECT count(*) FROM announcements').fetchone()
+
+        if start_ingestor and app.config['SUBMISSION_INGEST_MODE'] == 'journal':
+            submission_ingestor.start()
+        _started_pid = os.getpid()
+    return app
+
+
+@app.before_request
+def ensure_started() -> None:
+    """未經 create_app 啟動（例如直接 flask run）時，在第一個請求補做啟動流程。"""
+    if _started_pid != os.getpid():
+        create_app()
+
+
+
+_static_digests: Dict[str, Tuple[Tuple[int, int], str]] = {}
+# build-static 渲染頁面時在 WSGI environ 加上的標記
+STATIC_BUILD_ENVIRON_KEY = 'web_temple.static_build'
+# 上傳檔（內容定址、體積大）與 build-assets 的輸出（檔名已帶雜湊）由 nginx 直接提供，不複製指紋版本
+STATIC_BUILD_SKIP_PREFIXES = ('uploads/', 'dist/')
+
+
+def is_static_build() -> bool:
+    """目前的請求是否為 build-static 預先渲染。"""
+    return has_request_context() and bool(request.environ.get(STATIC_BUILD_ENVIRON_KEY))
+
+
+def fingerprinted_name(filename: str, digest: str) -> str:
+    """css/style.css -> css/style.<digest>.css"""
+    root, ext = os.path.splitext(filename)
+    return f'{root}.{digest}{ext}'
+
+
+def static_file_digest(filename: str) -> Optional[str]:
+    """
+    回傳 static/ 底下檔案的內容雜湊（前 12 碼），依 mtime 與大小記憶，檔案不存在時回傳 None。
+    """
+    path = safe_join(app.static_folder, filename)
+    if path is None:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+
+    signature = (st.st_mtime_ns, st.st_size)
+    cached = _static_digests.get(filename)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    _static_digests[filename] = (signature, _file_digest(path)[:12])
+    return _static_digests[filename][1]
+
+
+@app.url_defaults
+def add_static_digest(endpoint: str, values: Dict[str, any]) -> None:
+    """
+    url_for('static', ...) 自動加上 ?v=<內容雜湊>，檔案內容改變時網址跟著改變。
+    預先渲染靜態網站時改為指向 build-static 複製出的指紋檔名（上傳檔除外）。
+    """
+    if endpoint == 'static' and 'v' not in values:
+        filename = values.get('filename', '')
+        digest = static_file_digest(filename)
+        if not digest:
+            return
+        if is_static_build() and not filename.startswith(STATIC_BUILD_SKIP_PREFIXES):
+            values['filename'] = fingerprinted_name(filename, digest)
+        else:
+            values['v'] = digest
+
+
+@app.after_request
+def set_cache_headers(response):
+    """
+    依路由類型設定快取標頭：
+    靜態檔帶有正確雜湊時長期快取；公開頁面以 ETag 重新驗證；其餘（後台、表單）一律不快取。
+    """
+    if request.endpoint == 'static':
+        digest = request.args.get('v')
+        if digest and digest == static_file_digest(request.view_args.get('filename', '')):
+            response.cache_control.no_cache = False
+            response.cache_control.public = True
+            response.cache_control.max_age = app.config['STATIC_IMMUTABLE_MAX_AGE']
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+    elif g.get('cache_policy') == 'public':
+        response.cache_control.no_cache = True
+        response.make_conditional(request)
+    else:
+        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+        response.headers['Pragma'] = 'no-cache'
+        response.headers['Expires'] = '0'
+    return response
+
+
+# 前端資源：輸出檔名 -> 依序合併的來源檔（相對於專案根目錄）
+ASSET_BUNDLES = {
+    # 前台頁面（base.html）
+    'site.css': ('assets/vendor/bootstrap.min.css', 'assets/vendor/bootstrap-icons.min.css', 'templates/css/style.css'),
+    'site.js': ('templates/js/script.js',),
+    # 後台與表單頁面
+    'bootstrap.css': ('assets/vendor/bootstrap.min.css', 'assets/vendor/bootstrap-icons.min.css'),
+    'bootstrap.js': ('assets/vendor/popper.min.js', 'assets/vendor/bootstrap.min.js'),
+}
+ASSET_ICON_CSS = 'assets/vendor/bootstrap-icons.min.css'
+ASSET_ICON_FONT = 'assets/vendor/bootstrap-icons.woff2'
+# 掃描這些檔案找出用到的圖示（bi-*）
+ASSET_ICON_SOURCES = ('templates/**/*.html', 'templates/js/*.js', 'static/js/*.js')
+
+_CSS_STATIC_URL_RE = re.compile(r'url\(([\'"]?)/static/([^\'")?#]+)\1\)')
+# bootstrap-icons.min.css 每個圖示一條規則：.bi-<名稱>::before{content:"\<字碼>"}
+_CSS_ICON_RULE_RE = re.compile(r'\.(bi-[\w-]+)::before\{content:"\\([0-9a-fA-F]+)"\}')
+_CSS_FONT_FACE_RE = re.compile(r'@font-face\{[^}]*\}')
+_CSS_FONT_SRC_RE = re.compile(r'src:[^;}]+')
+_JS_SOURCE_MAP_RE = re.compile(r'^//# sourceMappingURL=.*$', re.M)
+_ASSET_ICON_NAME_RE = re.compile(r'\bbi-[\w-]+')
+
+
+class AssetPipeline:
+    """
+    把 ASSET_BUNDLES 的來源合併成單一檔案，以 rcssmin / rjsmin 壓縮；圖示樣式表只保留樣板用到的圖示，
+    字型換成只含這些圖示的子集並內嵌。輸出到 static/dist/<名稱>.<雜湊>.<副檔名>，並預先產生 .gz / .br。
+
+    來源檔、用到的圖示或程式有變動時才重新建置。manifest.json 記錄目前與上一版的輸出，
+    更早的檔案會被刪除（上一版保留給還沒重新載入的頁面）。
+    """
+
+    MANIFEST = 'manifest.json'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._manifest: Optional[Dict[str, any]] = None
+        # 建置期間寫出的檔案與已產生的字型子集
+        self._written: List[str] = []
+        self._font_sources: Dict[frozenset, str] = {}
+
+    @property
+    def folder(self) -> str:
+        return os.path.join(app.static_folder, app.config['ASSET_DIST_DIR'])
+
+    def url(self, name: str) -> str:
+        return url_for('static', filename=f"{app.config['ASSET_DIST_DIR']}/{self.files()[name]}")
+
+    def files(self) -> Dict[str, str]:
+        """{輸出名稱: 帶雜湊的檔名}"""
+        if self._manifest is None:
+            self.ensure_built()
+        return self._manifest['files']
+
+    def sizes(self) -> Dict[str, Dict[str, int]]:
+        if self._manifest is None:
+            self.ensure_built()
+        return self._manifest['sizes']
+
+    def ensure_built(self, force: bool = False) -> bool:
+        """來源有變動（或 force）時重新建置，回傳是否有建置。"""
+        with self._lock:
+            signature = self._source_signature()
+            manifest = self._load_manifest()
+            if not force and manifest.get('signature') == signature and all(
+                os.path.exists(os.path.join(self.folder, name)) for name in manifest.get('written', ())
+            ):
+                self._manifest = manifest
+                return False
+            self._manifest = self._build(signature, manifest)
+            return True
+
+    def _source_paths(self) -> List[str]:
+        paths = {os.path.join(app.root_path, source) for sources in ASSET_BUNDLES.values() for source in sources}
+        paths.add(os.path.join(app.root_path, ASSET_ICON_FONT))
+        return sorted(paths | {os.path.abspath(__file__)})
+
+    @staticmethod
+    def _used_icons() -> List[str]:
+        used = set()
+        for pattern in ASSET_ICON_SOURCES:
+            for path in glob.glob(os.path.join(app.root_path, pattern), recursive=True):
+                with open(path, encoding='utf-8', errors='replace') as f:
+                    used.update(_ASSET_ICON_NAME_RE.findall(f.read()))
+        return sorted(used)
+
+    def _source_signature(self) -> str:
+        # 樣板只影響用到哪些圖示，修改樣板本身不需要重新建置
+        parts = [self._used_icons()]
+        for path in self._source_paths():
+            st = os.stat(path)
+            parts.append((os.path.relpath(path, app.root_path), st.st_mtime_ns, st.st_size))
+        return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+    def _load_manifest(self) -> Dict[str, any]:
+        try:
+            with open(os.path.join(self.folder, self.MANIFEST), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _build(self, signature: str, previous: Dict[str, any]) -> Dict[str, any]:
+        self._written, self._font_sources = [], {}
+        used = set(self._used_icons())
+        files, sizes = {}, {}
+        # url_for 需要 request context
+        with app.test_request_context():
+            for name, sources in ASSET_BUNDLES.items():
+                text = self._build_css(sources, used) if name.endswith('.css') else self._build_js(sources)
+                files[name], sizes[name] = self._write(name, text.encode('utf-8'))
+
+        manifest = {'signature': signature, 'files': files, 'sizes': sizes, 'written': sorted(set(self._written))}
+        _write_if_changed(os.path.join(self.folder, self.MANIFEST),
+                          json.dumps(manifest, ensure_ascii=False, indent=1, sort_keys=True).encode('utf-8'))
+
+        keep = set(manifest['written']) | set(previous.get('written', ())) | {self.MANIFEST}
+        for name in os.listdir(self.folder):
+            if name not in keep and name.rsplit('.', 1)[0] not in keep:
+                try:
+                    os.remove(os.path.join(self.folder, name))
+                except OSError as e:
+                    print(f"刪除舊的前端資源失敗: {e}")
+        return manifest
+
+    def _read(self, source: str) -> str:
+        with open(os.path.join(app.root_path, source), encoding='utf-8') as f:
+            return f.read()
+
+    def _build_css(self, sources: Tuple[str, ...], used: set) -> str:
+        parts = []
+        for source in sources:
+            text = self._read(source)
+            if source == ASSET_ICON_CSS:
+                text = self._trim_icon_css(text, used)
+            if cssmin is not None:
+                text = cssmin(text, keep_bang_comments=True)
+            parts.append(text.replace('@charset "UTF-8";', '').strip())
+
+        css = _CSS_STATIC_URL_RE.sub(
+            lambda m: f"url({m.group(1)}{url_for('static', filename=m.group(2))}{m.group(1)})",
+            '\n'.join(parts)
+        )
+        return '@charset "UTF-8";\n' + css + '\n'
+
+    def _trim_icon_css(self, text: str, used: set) -> str:
+        """只保留用到的圖示規則，@font-face 換成只含這些圖示的字型子集；一個圖示都沒用到時刪除 @font-face。"""
+        codepoints = set()
+
+        def keep(match) -> str:
+            if match.group(1) not in used:
+                return ''
+            codepoints.add(int(match.group(2), 16))
+            return match.group(0)
+
+        text = _CSS_ICON_RULE_RE.sub(keep, text)
+        if not codepoints:
+            return _CSS_FONT_FACE_RE.sub('', text)
+        src = 'src:' + self._icon_font_src(frozenset(codepoints))
+        return _CSS_FONT_FACE_RE.sub(lambda m: _CSS_FONT_SRC_RE.sub(lambda _: src, m.group(0), count=1), text)
+
+    def _icon_font_src(self, codepoints: frozenset) -> str:
+        if codepoints in self._font_sources:
+            return self._font_sources[codepoints]
+        path = os.path.join(app.root_path, ASSET_ICON_FONT)
+        if font_subset is not None and brotli is not None:
+            # 子集通常只有幾 KB，直接內嵌在 CSS 裡省下一次請求
+            options = font_subset.Options()
+            options.flavor = 'woff2'
+            font = font_subset.load_font(path, options)
+            subsetter = font_subset.Subsetter(options)
+            subsetter.populate(unicodes=codepoints)
+            subsetter.subset(font)
+            buffer = io.BytesIO()
+            font_subset.save_font(font, buffer, options)
+            src = f'url(data:font/woff2;base64,{base64.b64encode(buffer.getvalue()).decode("ascii")}) format("woff2")'
+        else:
+            with open(path, 'rb') as f:
+                filename, _ = self._write(os.path.basename(path), f.read())
+            src = f'url({url_for("static", filename=app.config["ASSET_DIST_DIR"] + "/" + filename)}) format("woff2")'
+        self._font_sources[codepoints] = src
+        return src
+
+    def _build_js(self, sources: Tuple[str, ...]) -> str:
+        parts = []
+        for source in sources:
+            text = _JS_SOURCE_MAP_RE.sub('', self._read(source))
+            if jsmin is not None and not source.endswith('.min.js'):
+                text = jsmin(text, keep_bang_comments=True)
+            parts.append(text.strip())
+        return ';\n'.join(parts) + '\n'
+
+    def _write(self, name: str, data: bytes) -> Tuple[str, Dict[str, int]]:
+        """寫入帶雜湊的檔案與比原檔小的 .gz / .br，回傳 (檔名, 各版本大小)。"""
+        filename = fingerprinted_name(name, hashlib.sha256(data).hexdigest()[:12])
+        path = os.path.join(self.folder, filename)
+        sizes = {'raw': len(data)}
+        _write_if_changed(path, data)
+        variants = [('gz', gzip.compress(data, 9, mtime=0))]
+        if brotli is not None:
+            variants.append(('br', brotli.compress(data, quality=11)))
+        for suffix, body in variants:
+            if len(body) < len(data):
+                _write_if_changed(f'{path}.{suffix}', body)
+                sizes[suffix] = len(body)
+        self._written.append(filename)
+        return filename, sizes
+
+
+asset_pipeline = AssetPipeline()
+
+
+@app.template_global()
+def asset_url(name: str) -> str:
+    """樣板引用打包後的前端資源：{{ asset_url('site.css') }}"""
+    return asset_pipeline.url(name)
+
+
+@app.cli.command('build-assets')
+@click.option('--force', is_flag=True, help='來源沒有變動也重新建置')
+def build_assets_command(force: bool) -> None:
+    """合併、精簡並預先壓縮前端資源到 static/dist。"""
+    built = asset_pipeline.ensure_built(force=force)
+    print('已重新建置' if built else '來源沒有變動，沿用現有檔案')
+    for name, filename in asset_pipeline.files().items():
+        sizes = asset_pipeline.sizes()[name]
+        print(f"{name} -> {filename}: {sizes['raw']} bytes，gzip {sizes.get('gz', '-')}，brotli {sizes.get('br', '-')}")
+
+
+# Accept-Encoding 與預先壓縮檔的副檔名，依偏好順序
+PRECOMPRESSED_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def send_static_precompressed(filename: str):
+    """
+    取代 Flask 預設的 static 路由：檔案旁有 build-assets 產生的 .br / .gz 時，依 Accept-Encoding 直接送出壓縮檔。
+    """
+    path = safe_join(app.static_folder, filename)
+    has_variants = False
+    for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+        if path is None or not os.path.isfile(path + suffix):
+            continue
+        has_variants = True
+        if request.accept_encodings[encoding]:
+            response = send_file(
+                path + suffix,
+                mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                max_age=app.get_send_file_max_age(filename),
+                conditional=True,
+            )
+            response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+            return response
+    response = app.send_static_file(filename)
+    if has_variants:
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+app.view_functions['static'] = send_static_precompressed
+
+
+class CompressedBodyCache:
+    """
+    公開頁面壓縮後的內容，以 (ETag, 編碼) 為鍵的 LRU，依總位元組數淘汰。
+
+    ETag 是內容雜湊，頁面內容改變後鍵也不同，舊項目會自然被淘汰，不需要另外失效。
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Tuple[str, str], bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def set(self, key: Tuple[str, str], body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._entries[key] = body
+            self.bytes += len(body)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+compressed_bodies = CompressedBodyCache(app.config['COMPRESS_CACHE_BYTES'])
+
+
+def negotiate_encoding() -> Optional[str]:
+    """依 Accept-Encoding 選擇回應的壓縮方式，優先使用 brotli；都不接受時回傳 None。"""
+    for encoding, _ in PRECOMPRESSED_ENCODINGS:
+        if encoding == 'br' and brotli is None:
+            continue
+        if request.accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def compress_body(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, level, mtime=0)
 
 
 @app.after_request
-def add_no_cache_headers(response):
-    response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
+def compress_response(response):
+    """
+    依 Accept-Encoding 以 brotli 或 gzip 壓縮文字類回應；圖片等已壓縮的格式、檔案與串流回應不處理。
+    公開頁面（cached_page，帶內容雜湊 ETag）以較高壓縮率壓縮一次後保留在 compressed_bodies。
+    在 set_cache_headers 之前執行，ETag 加上編碼後綴，304 判斷才會對應到同一種編碼。
+    """
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in app.config['COMPRESS_MIMETYPES']):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if encoding is None or response.cache_control.no_transform:
+        return response
+    data = response.get_data()
+    if len(data) < app.config['COMPRESS_MIN_SIZE']:
+        return response
+
+    etag, weak = response.get_etag()
+    cacheable = g.get('cache_policy') == 'public' and etag is not None and not weak
+    body = compressed_bodies.get((etag, encoding)) if cacheable else None
+    if body is None:
+        started = time.perf_counter()
+        levels = app.config['COMPRESS_CACHED_LEVELS' if cacheable else 'COMPRESS_LEVELS']
+        body = compress_body(data, encoding, levels[encoding])
+        metrics.observe('response_compress_seconds', time.perf_counter() - started, encoding=encoding)
+        if cacheable:
+            compressed_bodies.set((etag, encoding), body)
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    if etag is not None:
+        response.set_etag(f'{etag}-{encoding}', weak)
     return response
 
 
+class StaticSiteBuilder:
+    """
+    把公開頁面預先渲染成靜態 HTML，並把 static/ 複製成指紋檔名，讓 nginx 不經過 Python 直接提供。
+
+    每個頁面依其資料來源算出簽章：樣板、程式與靜態檔雜湊，加上頁面用到的公告資料。
+    簽章與上次建置（記錄在 manifest）相同的頁面不重新渲染；不再公開的頁面會被刪除。
+    舊的指紋靜態檔不刪除，瀏覽器快取中的舊頁面仍可載入。
+    """
+
+    MANIFEST = '.build-manifest.json'
+    STATIC_ENDPOINTS = ('member', 'history', 'event', 'light', 'solve')
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.client = app.test_client()
+
+    def build(self, full: bool = False) -> Dict[str, any]:
+        started = time.perf_counter()
+        previous = self._load_manifest()
+        old_pages = {} if full else previous.get('pages', {})
+        assets, copied = self._copy_assets()
+        base = self._signature(_file_digest(__file__), self._template_digests(), assets, asset_pipeline.files())
+
+        # 簽章與渲染都以同一份最新資料為準
+        announcement_feed.invalidate()
+        pages: Dict[str, str] = {}
+        report = {'pages': 0, 'rendered': 0, 'unchanged': 0, 'removed': 0, 'failed': [], 'assets_copied': copied}
+        for path, url, signature in self._iter_pages(base):
+            report['pages'] += 1
+            target = os.path.join(self.output_dir, path)
+            if old_pages.get(path) == signature and os.path.exists(target):
+                pages[path] = signature
+                continue
+            response = self.client.get(url, environ_overrides={STATIC_BUILD_ENVIRON_KEY: True})
+            if response.status_code != 200:
+                # 不記錄簽章，下次建置會再試一次
+                report['failed'].append(f'{url} ({response.status_code})')
+                continue
+            if _write_if_changed(target, response.get_data()):
+                report['rendered'] += 1
+            else:
+                report['unchanged'] += 1
+            pages[path] = signature
+
+        for path in previous.get('pages', {}).keys() - pages.keys():
+            try:
+                os.remove(os.path.join(self.output_dir, path))
+                report['removed'] += 1
+            except FileNotFoundError:
+                pass
+
+        now = schedule_now()
+        report['next_schedule_change'] = next_schedule_boundary(get_db_connection(), now)
+        _write_if_changed(os.path.join(self.output_dir, self.MANIFEST), json.dumps({
+            'built_at': now,
+            'next_schedule_change': report['next_schedule_change'],
+            'assets': assets,
+            'pages': pages,
+        }, ensure_ascii=False, indent=1, sort_keys=True).encode('utf-8'))
+        report['seconds'] = round(time.perf_counter() - started, 3)
+        return report
+
+    def _iter_pages(self, base: str) -> Iterator[Tuple[str, str, str]]:
+        """產生 (輸出路徑, 網址, 簽章)；輸出路徑對應 nginx 的 try_files $uri.html。"""
+        conn = get_db_connection()
+        now = schedule_now()
+        cards = conn.execute(
+            f'SELECT {ANNOUNCEMENT_CARD_COLUMNS} FROM announcements WHERE {ANNOUNCEMENT_VISIBLE_SQL} ORDER BY id DESC',
+            (now, now)
+        ).fetchall()
+
+        with app.test_request_context():
+            yield 'index.html', url_for('index'), self._signature(base, 'index', [tuple(r) for r in cards[:3]])
+            for endpoint in self.STATIC_ENDPOINTS:
+                yield f'{endpoint}.html', url_for(endpoint), self._signature(base, endpoint)
+
+            # 與 AnnouncementFeed.page 相同的 keyset 分頁：第 n 頁的游標是前一頁最後一則的 id
+            per_page = app.config['ANNOUNCEMENTS_PER_PAGE']
+            for start in range(0, max(len(cards), 1), per_page):
+                page = cards[start:start + per_page]
+                signature = self._signature(base, 'list', [tuple(r) for r in page], len(cards) > start + per_page)
+                if start == 0:
+                    yield 'announcements.html', url_for('announcement_list'), signature
+                else:
+                    before = cards[start - 1]['id']
+                    yield (f'announcements/before/{before}.html',
+                           url_for('announcement_list', before=before), signature)
+
+            announcements = conn.execute(
+                f'SELECT * FROM announcements WHERE {ANNOUNCEMENT_VISIBLE_SQL} ORDER BY id', (now, now)
+            )
+            images = conn.execute('SELECT * FROM images ORDER BY announcement_id, id')
+            image = images.fetchone()
+            for row in announcements:
+                while image is not None and image['announcement_id'] < row['id']:
+                    image = images.fetchone()
+                attached = []
+                while image is not None and image['announcement_id'] == row['id']:
+                    attached.append(tuple(image))
+                    image = images.fetchone()
+                yield (f'announcements/{row["id"]}.html',
+                       url_for('announcement_detail', announcement_id=row['id']),
+                       self._signature(base, 'detail', tuple(row), attached))
+
+    def _copy_assets(self) -> Tuple[Dict[str, str], int]:
+        """把 static/ 複製成 <輸出目錄>/static/ 底下的指紋檔名，回傳 ({原檔名: 指紋檔名}, 新複製的數量)。"""
+        assets, copied = {}, 0
+        skip = tuple(prefix.rstrip('/') for prefix in STATIC_BUILD_SKIP_PREFIXES)
+        for filename in _iter_sorted_files(app.static_folder, skip=skip):
+            digest = static_file_digest(filename)
+            if digest is None:
+                continue
+            assets[filename] = fingerprinted_name(filename, digest)
+            target = os.path.join(self.output_dir, 'static', assets[filename])
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target))
+                os.close(fd)
+                shutil.copyfile(os.path.join(app.static_folder, filename), tmp_path)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, target)
+                copied += 1
+        return assets, copied
+
+    @staticmethod
+    def _template_digests() -> List[Tuple[str, str]]:
+        folder = os.path.join(app.root_path, app.template_folder)
+        return [(name, _file_digest(os.path.join(folder, name))) for name in _iter_sorted_files(folder)]
+
+    @staticmethod
+    def _signature(*parts) -> str:
+        return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+    def _load_manifest(self) -> Dict[str, any]:
+        try:
+            with open(os.path.join(self.output_dir, self.MANIFEST), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_if_changed(path: str, data: bytes) -> bool:
+    """內容不同時才以原子方式寫入（保留未變更檔案的 mtime 與 ETag），回傳是否有寫入。"""
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+    return True
+
+
+@app.cli.command('build-static')
+@click.option('--output', 'output_dir', type=click.Path(file_okay=False), help='輸出目錄，預設為 STATIC_BUILD_DIR')
+@click.option('--full', is_flag=True, help='忽略上次的建置紀錄，重新渲染所有頁面')
+def build_static_command(output_dir: Optional[str], full: bool) -> None:
+    """
+    把公開頁面與公告預先渲染成靜態 HTML，只重新渲染內容有變動的頁面。
+    排程上架 / 下架也會改變頁面，建議以 cron 每分鐘執行一次。
+    """
+    # cron 執行時不啟動提交日誌寫入器，避免搶走 worker 的遺留日誌
+    create_app(start_ingestor=False)
+    report = StaticSiteBuilder(output_dir or app.config['STATIC_BUILD_DIR']).build(full=full)
+    print(f"共 {report['pages']} 頁：重新渲染 {report['rendered']}、內容相同 {report['unchanged']}、"
+          f"移除 {report['removed']}；新複製靜態檔 {report['assets_copied']} 個，耗時 {report['seconds']} 秒")
+    if report['next_schedule_change']:
+        print(f"下一個排程上架 / 下架時間: {report['next_schedule_change']}")
+    for failure in report['failed']:
+        print(f"渲染失敗: {failure}")
+
+
 if __name__ == "__main__":
-    app.run(host="127.0.0.1", port=5001)
+    create_app().run(host="127.0.0.1", port=5001)
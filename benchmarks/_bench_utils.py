@@ -0,0 +1,64 @@
+"""
+效能測試共用工具：在暫存目錄建立網站副本，避免測試動到正式的 database.db 與 uploads。
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_site_copy() -> str:
+    """複製 app.py、資料庫、templates、static 與 assets 到暫存目錄並切換工作目錄，回傳該目錄。"""
+    workdir = tempfile.mkdtemp(prefix='temple-bench-')
+    for name in os.listdir(ROOT):
+        src = os.path.join(ROOT, name)
+        if name in ('templates', 'static', 'assets'):
+            shutil.copytree(src, os.path.join(workdir, name))
+        elif name.endswith('.py') or name == 'database.db':
+            shutil.copy(src, os.path.join(workdir, name))
+    os.chdir(workdir)
+    sys.path.insert(0, workdir)
+    return workdir
+
+
+def load_app():
+    """在網站副本中匯入 app 模組、執行啟動流程並回傳模組。"""
+    make_site_copy()
+    import app as app_module
+    app_module.app.config['TESTING'] = True
+    app_module.create_app()
+    return app_module
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """回傳樣本的百分位數（最近秩法）。"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def timed(fn: Callable[[], object], repeat: int) -> List[float]:
+    """執行 fn 共 repeat 次，回傳每次耗時（毫秒）。"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(label: str, samples: List[float], elapsed: float) -> Dict[str, float]:
+    """印出並回傳吞吐量與延遲統計。"""
+    stats = {
+        'rps': len(samples) / elapsed if elapsed else 0.0,
+        'p50': percentile(samples, 50),
+        'p99': percentile(samples, 99),
+    }
+    print(f"{label:<28} {stats['rps']:>10.1f} req/s   p50 {stats['p50']:>8.2f} ms   p99 {stats['p99']:>8.2f} ms")
+    return stats
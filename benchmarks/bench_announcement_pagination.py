@@ -0,0 +1,52 @@
+"""
+灌入大量公告後，量測 keyset 分頁在不同深度的每頁延遲，並與 OFFSET 分頁比較。
+
+使用方式：python benchmarks/bench_announcement_pagination.py [--rows 100000]
+"""
+import argparse
+
+from _bench_utils import load_app, percentile, timed
+
+
+def seed(conn, rows: int) -> None:
+    content = '雷王聖誕千秋法會，歡迎信眾蒞臨參拜。' * 40
+    conn.executemany(
+        'INSERT INTO announcements (title, content, image, timestamp, excerpt) VALUES (?, ?, ?, ?, ?)',
+        ((f'公告 {i}', content, None, '2025-01-01', content[:80]) for i in range(rows))
+    )
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    app_module = load_app()
+    app = app_module.app
+    per_page = app.config['ANNOUNCEMENTS_PER_PAGE']
+
+    with app.app_context():
+        conn = app_module.get_db_connection()
+        seed(conn, args.rows)
+        max_id = conn.execute('SELECT max(id) FROM announcements').fetchone()[0]
+
+        print(f"{'page':>8} {'keyset p50':>12} {'keyset p99':>12} {'offset p50':>12} {'offset p99':>12}  (ms)")
+        for page in (1, 10, 100, 1000, args.rows // per_page - 1):
+            cursor = max_id - (page - 1) * per_page + 1 if page > 1 else None
+            keyset = timed(lambda: app_module.get_announcement_page(cursor, per_page), args.repeat)
+            offset = timed(lambda: conn.execute(
+                f'SELECT {app_module.ANNOUNCEMENT_CARD_COLUMNS} FROM announcements ORDER BY id DESC LIMIT ? OFFSET ?',
+                (per_page, (page - 1) * per_page)
+            ).fetchall(), args.repeat)
+            print(f'{page:>8} {percentile(keyset, 50):>12.3f} {percentile(keyset, 99):>12.3f}'
+                  f' {percentile(offset, 50):>12.3f} {percentile(offset, 99):>12.3f}')
+
+    client = app.test_client()
+    deep = timed(lambda: client.get('/announcements', query_string={'before': max_id // 2}), 1)
+    print(f'GET /announcements?before={max_id // 2} (uncached): {deep[0]:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
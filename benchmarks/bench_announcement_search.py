@@ -0,0 +1,60 @@
+"""
+以大量合成公告量測 FTS5（trigram）全文搜尋與 LIKE 全表掃描的查詢延遲。
+
+使用方式：python benchmarks/bench_announcement_search.py [--rows 50000]
+"""
+import argparse
+import random
+
+from _bench_utils import load_app, percentile, timed
+
+WORDS = [
+    '雷王', '聖誕', '千秋', '法會', '點燈', '祈福', '光明燈', '太歲燈', '平安', '進香', '遶境', '普渡',
+    '收驚', '問事', '信眾', '參拜', '農曆', '初一', '十五', '廟埕', '宮廟', '神明', '香油', '補運',
+]
+# 少見的詞只出現在約千分之一的公告中，模擬實際搜尋特定活動的情境
+RARE_WORDS = ['玉旨敕封', '巡天元帥', '丁酉年', '安奉斗燈']
+
+
+def synthetic_text(rng: random.Random, words: int) -> str:
+    text = '，'.join(''.join(rng.choice(WORDS) for _ in range(4)) for _ in range(words // 4)) + '。'
+    if rng.random() < 0.001:
+        text += rng.choice(RARE_WORDS) + '。'
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    app_module = load_app()
+    rng = random.Random(0)
+    with app_module.app.app_context():
+        conn = app_module.get_db_connection()
+        with conn:
+            conn.executemany(
+                'INSERT INTO announcements (title, content, timestamp, excerpt) VALUES (?, ?, ?, ?)',
+                (
+                    (synthetic_text(rng, 4), content, '2025-01-01', content[:80])
+                    for content in (synthetic_text(rng, 200) for _ in range(args.rows))
+                )
+            )
+
+        per_page = app_module.app.config['SEARCH_RESULTS_PER_PAGE']
+        print('最後一列為出現在大多數公告中的常見詞，FTS 需要為全部命中計算 bm25 排名')
+        print(f"{'query':<12} {'fts p50':>10} {'fts p99':>10} {'like p50':>10} {'like p99':>10}  (ms)")
+        for query in ('玉旨敕封', '巡天元帥', '丁酉年', '安奉斗燈', '光明燈'):
+            fts = timed(lambda: app_module.search_announcements(query, 1, per_page), args.repeat)
+            like = timed(lambda: conn.execute(
+                'SELECT id FROM announcements WHERE ' + ' AND '.join(['content LIKE ?'] * len(query.split()))
+                + ' ORDER BY id DESC LIMIT ?',
+                (*[f'%{term}%' for term in query.split()], per_page)
+            ).fetchall(), args.repeat)
+            print(f'{query:<12} {percentile(fts, 50):>10.2f} {percentile(fts, 99):>10.2f}'
+                  f' {percentile(like, 50):>10.2f} {percentile(like, 99):>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+量測公告批次匯入的速度（則/秒），並與逐則透過新增公告頁面送出的方式比較。
+
+產生含 --posts 則公告的 zip 備份（封面與附加圖片從 --files 個不同檔案中挑選），
+以 import_announcements_archive 匯入；再以後台表單逐則新增 --single 則作為對照，最後測試匯出速度。
+
+使用方式：python benchmarks/bench_bulk_import.py [--posts 50000] [--files 500] [--single 300]
+"""
+import argparse
+import io
+import json
+import os
+import random
+import time
+import zipfile
+
+from _bench_utils import load_app
+
+
+def build_archive(path: str, posts: int, files: int, rng: random.Random) -> None:
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        names = [f'files/img_{i}.jpg' for i in range(files)]
+        lines = []
+        for i in range(posts):
+            lines.append(json.dumps({
+                'title': f'公告 {i}',
+                'content': '法會通知，' * rng.randint(20, 200),
+                'timestamp': f'20{10 + i % 15:02d}-01-01',
+                'image': rng.choice(names) if rng.random() < 0.5 else None,
+                'images': rng.sample(names, rng.randint(0, 2)),
+            }, ensure_ascii=False))
+        archive.writestr('announcements.jsonl', '\n'.join(lines))
+        for name in names:
+            archive.writestr(name, os.urandom(rng.randint(20_000, 200_000)), compress_type=zipfile.ZIP_STORED)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=50000)
+    parser.add_argument('--files', type=int, default=500)
+    parser.add_argument('--single', type=int, default=300)
+    args = parser.parse_args()
+
+    app_module = load_app()
+    rng = random.Random(0)
+    build_archive('bench_import.zip', args.posts, args.files, rng)
+
+    report = app_module.import_announcements_archive('bench_import.zip')
+    print(f"批次匯入 {report['announcements']} 則、{report['images']} 張附加圖片、{report['files']} 個檔案："
+          f"{report['seconds']:.2f} 秒，{report['rows_per_second']:.0f} 則/秒")
+
+    client = app_module.app.test_client()
+    client.post('/login', data={'account': 'admin', 'password': 'admin'})
+    payload = os.urandom(100_000)
+    start = time.perf_counter()
+    for i in range(args.single):
+        client.post('/admin_announcements/create_announcements', data={
+            'title': f'單筆 {i}', 'content': '法會通知，' * 100,
+            'image': (io.BytesIO(payload + i.to_bytes(4, 'big')), 'cover.jpg'),
+        }, content_type='multipart/form-data')
+    elapsed = time.perf_counter() - start
+    print(f'逐則新增 {args.single} 則：{elapsed:.2f} 秒，{args.single / elapsed:.0f} 則/秒')
+
+    start = time.perf_counter()
+    size = 0
+    with app_module.app.app_context():
+        for chunk in app_module.export_announcements_archive():
+            size += len(chunk)
+    elapsed = time.perf_counter() - start
+    print(f'串流匯出 {size / 1e6:.1f} MB：{elapsed:.2f} 秒')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+量測 /、/history 與 /announcements 在不同壓縮設定下每個請求傳輸的位元組數與 CPU 時間。
+
+頁面快取皆已暖機，只比較壓縮本身的成本：
+- identity：不壓縮
+- 每次壓縮：不保留壓縮結果，每個請求以快速等級（gzip 6 / brotli 4）重新壓縮
+- 快取：以最高等級（gzip 9 / brotli 11）壓縮一次後保留在記憶體
+
+使用方式：python benchmarks/bench_compression.py [--requests 500]
+"""
+import argparse
+import time
+
+from _bench_utils import load_app, percentile
+
+
+PATHS = ('/', '/history', '/announcements')
+
+
+def seed(conn, rows: int) -> None:
+    content = '雷王聖誕千秋法會，歡迎信眾蒞臨參拜，當日備有平安餐與祈福儀式。' * 20
+    conn.executemany(
+        'INSERT INTO announcements (title, content, image, timestamp, excerpt) VALUES (?, ?, ?, ?, ?)',
+        ((f'公告 {i}：農曆活動與點燈說明', content, None, '2025-01-01', content[:80]) for i in range(rows))
+    )
+    conn.commit()
+
+
+def measure(client, path: str, encoding: str, requests: int):
+    headers = {'Accept-Encoding': encoding}
+    client.get(path, headers=headers)
+    samples = []
+    size = 0
+    cpu_start = time.process_time()
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        size = len(response.data)
+    cpu_ms = (time.process_time() - cpu_start) * 1000 / requests
+    return size, cpu_ms, percentile(samples, 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    app_module = load_app()
+    app = app_module.app
+    with app.app_context():
+        seed(app_module.get_db_connection(), 50)
+    app_module.invalidate_announcement_pages()
+    client = app.test_client()
+    cached_levels = dict(app.config['COMPRESS_CACHED_LEVELS'])
+
+    modes = (
+        ('identity', 'identity', None),
+        ('gzip 每次壓縮', 'gzip', False),
+        ('gzip 快取', 'gzip', True),
+        ('brotli 每次壓縮', 'br', False),
+        ('brotli 快取', 'br', True),
+    )
+    print(f"{'path':<16} {'mode':<16} {'bytes':>8} {'ratio':>7} {'CPU ms/req':>11} {'p50 ms':>8}")
+    for path in PATHS:
+        baseline = None
+        for label, encoding, cached in modes:
+            if cached is not None:
+                app.config['COMPRESS_CACHED_LEVELS'] = cached_levels if cached else app.config['COMPRESS_LEVELS']
+                app_module.compressed_bodies.max_bytes = app.config['COMPRESS_CACHE_BYTES'] if cached else 0
+            size, cpu_ms, p50 = measure(client, path, encoding, args.requests)
+            baseline = baseline or size
+            print(f'{path:<16} {label:<16} {size:>8} {size / baseline:>7.1%} {cpu_ms:>11.3f} {p50:>8.3f}')
+    print('compressed_bodies:', app_module.compressed_bodies.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+比較「每次呼叫都重新連線」與「每執行緒重用連線 + WAL」兩種資料庫連線方式。
+
+以多個執行緒模擬節慶尖峰：大部分請求讀取公告詳情頁，少部分送出 /form/<id>。
+讀取前都會清除頁面快取，否則命中快取的請求完全不碰資料庫，量不到連線方式的差異。
+使用方式：python benchmarks/bench_db_connection.py [--threads 8] [--requests 400]
+"""
+import argparse
+import sqlite3
+import threading
+import time
+
+from _bench_utils import load_app, report
+
+
+def legacy_connection(app_module):
+    """舊版行為：每次呼叫都開啟新連線，使用預設的 rollback journal。"""
+    def get_db_connection():
+        conn = sqlite3.connect(app_module.app.config['DATABASE'])
+        conn.row_factory = sqlite3.Row
+        return conn
+    return get_db_connection
+
+
+def run(app_module, form_id: int, announcement_id: int, threads: int, per_thread: int, write_ratio: int):
+    app = app_module.app
+    samples, lock = [], threading.Lock()
+
+    def worker(n: int):
+        client = app.test_client()
+        local = []
+        for i in range(per_thread):
+            start = time.perf_counter()
+            if (i + n) % write_ratio == 0:
+                client.post(f'/form/{form_id}', data={'name': 'bench', 'email': 'b@x', 'phone': '0900'})
+            else:
+                app_module.page_cache.clear()
+                client.get(f'/announcements/{announcement_id}')
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            samples.extend(local)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return samples, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=400, help='每個執行緒送出的請求數')
+    parser.add_argument('--write-ratio', type=int, default=5, help='每 N 個請求中有 1 個是表單送出')
+    args = parser.parse_args()
+
+    app_module = load_app()
+    pooled = app_module.get_db_connection
+    app_module.discard_thread_connection()
+    conn = sqlite3.connect(app_module.app.config['DATABASE'])
+    conn.execute('PRAGMA journal_mode = DELETE')
+    conn.close()
+    app_module.get_db_connection = legacy_connection(app_module)
+
+    with app_module.app.app_context():
+        form_id = app_module.create_form_record('bench', '', [])
+        now = app_module.schedule_now()
+        announcement_id = app_module.get_db_connection().execute(
+            f'SELECT max(id) FROM announcements WHERE {app_module.ANNOUNCEMENT_VISIBLE_SQL}', (now, now)
+        ).fetchone()[0]
+    params = (form_id, announcement_id, args.threads, args.requests, args.write_ratio)
+    report('before (connect per call)', *run(app_module, *params))
+
+    app_module.get_db_connection = pooled
+    report('after (per-thread + WAL)', *run(app_module, *params))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+量測單一 form_submissions 資料表在大量表單下的寫入與列表吞吐量。
+
+使用方式：python benchmarks/bench_form_submissions.py [--forms 2000] [--submissions 20000]
+"""
+import argparse
+import random
+import time
+
+from _bench_utils import load_app, percentile, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--forms', type=int, default=2000)
+    parser.add_argument('--submissions', type=int, default=20000)
+    parser.add_argument('--list-repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    app_module = load_app()
+    fields = [{'original_name': name, 'sanitized_name': name} for name in ('燈種', '地址', '生辰')]
+    payload = {'name': '王小明', 'email': 'ming@example.com', 'phone': '0912345678',
+               '燈種': '光明燈', '地址': '台中市太平區', '生辰': '民國70年1月1日'}
+
+    with app_module.app.app_context():
+        start = time.perf_counter()
+        form_ids = [app_module.create_form_record(f'表單 {i}', '', fields) for i in range(args.forms)]
+        print(f'created {args.forms} forms in {time.perf_counter() - start:.2f} s')
+
+        forms = {form_id: app_module.get_form_by_id(form_id) for form_id in form_ids}
+        rng = random.Random(0)
+        start = time.perf_counter()
+        for _ in range(args.submissions):
+            app_module.save_submission(forms[rng.choice(form_ids)], payload)
+        elapsed = time.perf_counter() - start
+        print(f'insert: {args.submissions / elapsed:>10.1f} submissions/s')
+
+        per_page = app_module.app.config['SUBMISSIONS_PER_PAGE']
+        samples = timed(
+            lambda: app_module.get_submissions_with_ordered_headers(rng.choice(form_ids), None, per_page),
+            args.list_repeat
+        )
+        print(f'list:   {len(samples) / (sum(samples) / 1000):>10.1f} forms/s   '
+              f'p50 {percentile(samples, 50):.2f} ms   p99 {percentile(samples, 99):.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
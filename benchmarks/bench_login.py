@@ -0,0 +1,93 @@
+"""
+在暴力嘗試登入的壓力下量測正常登入的延遲，比較有無登入限流的差異。
+
+攻擊端以多個執行緒從少數 IP 按固定總速率送出錯誤密碼；同時另一個執行緒以正確密碼登入。
+沒有限流時每次嘗試都要查詢資料庫並計算一次 scrypt，超過 CPU 能負擔的速率後正常登入只能排在後面。
+
+使用方式：python benchmarks/bench_login.py [--attackers 8] [--rate 200] [--duration 5]
+"""
+import argparse
+import secrets
+import threading
+import time
+
+from _bench_utils import load_app, percentile
+
+
+def run(app_module, attackers: int, rate: float, duration: float):
+    app = app_module.app
+    deadline = time.perf_counter() + duration
+    attack_samples, login_samples, rejected = [], [], [0]
+    lock = threading.Lock()
+
+    def attacker(n: int):
+        client = app.test_client()
+        local, blocked = [], 0
+        interval = attackers / rate
+        next_at = time.perf_counter()
+        while time.perf_counter() < deadline:
+            # 固定速率送出；處理不及時不補送，直接送下一個
+            next_at += interval
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            start = time.perf_counter()
+            r = client.post('/login', data={'account': 'admin', 'password': secrets.token_hex(4)},
+                            environ_base={'REMOTE_ADDR': f'203.0.113.{n % 4}'})
+            local.append((time.perf_counter() - start) * 1000)
+            blocked += r.status_code == 429
+        with lock:
+            attack_samples.extend(local)
+            rejected[0] += blocked
+
+    def legitimate():
+        client = app.test_client()
+        n = 0
+        while time.perf_counter() < deadline:
+            n += 1
+            start = time.perf_counter()
+            r = client.post('/login', data={'account': 'staff', 'password': 'correct horse'},
+                            environ_base={'REMOTE_ADDR': f'198.51.100.{n % 250}'})
+            login_samples.append((time.perf_counter() - start) * 1000)
+            assert r.status_code == 302, r.status_code
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=attacker, args=(n,)) for n in range(attackers)]
+    threads.append(threading.Thread(target=legitimate))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return attack_samples, rejected[0], login_samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--attackers', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=200.0, help='攻擊端每秒總嘗試次數')
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args()
+
+    app_module = load_app()
+    with app_module.app.app_context():
+        with app_module.get_db_connection() as conn:
+            conn.execute(
+                'INSERT INTO members (username, account, password) VALUES (?, ?, ?)',
+                ('staff', 'staff', app_module.hash_password('correct horse'))
+            )
+
+    limiters = (app_module.login_ip_limiter, app_module.login_account_limiter)
+    print(f"{'':<10} {'attempts/s':>11} {'429':>7} {'attack p99':>11} {'login p50':>10} {'login p99':>10}  (ms)")
+    for label, unlimited in (('無限流', True), ('有限流', False)):
+        for limiter in limiters:
+            limiter._buckets.clear()
+            limiter.capacity = 10 ** 9 if unlimited else limiter.capacity
+        attack, rejected, logins = run(app_module, args.attackers, args.rate, args.duration)
+        print(f'{label:<10} {len(attack) / args.duration:>11.1f} {rejected:>7} {percentile(attack, 99):>11.2f}'
+              f' {percentile(logins, 50):>10.2f} {percentile(logins, 99):>10.2f}')
+        for limiter, setting in zip(limiters, ('LOGIN_RATE_PER_IP', 'LOGIN_RATE_PER_ACCOUNT')):
+            limiter.capacity = app_module.app.config[setting][0]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+量測新 worker 從啟動到回應第一個請求所需時間（time to first response）：
+舊流程（匯入時才初始化、第一次請求才編譯樣板）與 create_app（位元組碼快取已預熱）的比較。
+
+每次量測都開一個新的 Python 行程，模擬部署或自動擴展後的冷啟動。
+使用方式：python benchmarks/bench_startup.py [--runs 5]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+
+from _bench_utils import make_site_copy, percentile
+
+CHILD = r'''
+import time
+start = time.perf_counter()
+import app as app_module
+if {use_factory}:
+    app_module.create_app()
+ready = time.perf_counter()
+client = app_module.app.test_client()
+for path in ('/', '/announcements', '/history'):
+    assert client.get(path).status_code == 200
+done = time.perf_counter()
+print(f'{{(ready - start) * 1000:.1f}} {{(done - ready) * 1000:.1f}} {{(done - start) * 1000:.1f}}')
+'''
+
+
+def run_child(use_factory: bool):
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD.format(use_factory=use_factory)],
+        capture_output=True, text=True, check=True, cwd=os.getcwd()
+    ).stdout.split()
+    return [float(value) for value in output]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = make_site_copy()
+    cache_dir = os.path.join(workdir, '.jinja_cache')
+
+    for label, use_factory in (('lazy (no bytecode cache)', False), ('create_app (warm cache)', True)):
+        if use_factory:
+            run_child(True)  # 第一次執行產生位元組碼快取，之後的 worker 直接沿用
+        results = []
+        for _ in range(args.runs):
+            if not use_factory:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            results.append(run_child(use_factory))
+        startup = [r[0] for r in results]
+        first = [r[1] for r in results]
+        total = [r[2] for r in results]
+        print(f'{label:<26} startup p50 {percentile(startup, 50):7.1f} ms   '
+              f'first 3 responses p50 {percentile(first, 50):7.1f} ms   '
+              f'time to first responses p50 {percentile(total, 50):7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
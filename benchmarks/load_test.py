@@ -0,0 +1,131 @@
+"""
+以 gunicorn 啟動網站副本，對 /、/announcements 與 /form/<id> 施加負載，
+比較不同 worker 數量下的吞吐量與延遲，觀察隨核心數的擴展情形。
+
+使用方式：python benchmarks/load_test.py [--workers 1,2,4] [--duration 10] [--concurrency 32]
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from _bench_utils import load_app, percentile
+
+
+def wait_for_port(port: int, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'gunicorn 沒有在 {timeout} 秒內啟動')
+
+
+def client_process(port: int, form_id: int, threads: int, duration: float, queue) -> None:
+    """單一客戶端行程：多個執行緒各自用 keep-alive 連線輪流請求各頁面。"""
+    import threading
+
+    paths = ['/', '/announcements', f'/form/{form_id}']
+    samples, errors, lock = [], [0], threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(n: int):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        local, i = [], n
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                if i % 10 == 0:
+                    body = f'name=load&email=l%40x&phone=0900'
+                    conn.request('POST', path if path.startswith('/form') else f'/form/{form_id}', body,
+                                 {'Content-Type': 'application/x-www-form-urlencoded'})
+                else:
+                    conn.request('GET', path)
+                conn.getresponse().read()
+                local.append((time.perf_counter() - start) * 1000)
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+                with lock:
+                    errors[0] += 1
+        with lock:
+            samples.extend(local)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    queue.put((samples, errors[0]))
+
+
+def run_load(port: int, form_id: int, concurrency: int, duration: float, client_procs: int):
+    queue = multiprocessing.Queue()
+    per_proc = max(1, concurrency // client_procs)
+    procs = [
+        multiprocessing.Process(target=client_process, args=(port, form_id, per_proc, duration, queue))
+        for _ in range(client_procs)
+    ]
+    for p in procs:
+        p.start()
+    samples, errors = [], 0
+    for _ in procs:
+        s, e = queue.get()
+        samples.extend(s)
+        errors += e
+    for p in procs:
+        p.join()
+    return samples, errors
+
+
+def main():
+    cores = os.cpu_count() or 1
+    default_workers = ','.join(str(n) for n in (1, 2, 4, 8, 16) if n <= cores) or '1'
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', default=default_workers, help='以逗號分隔的 worker 數量')
+    parser.add_argument('--threads', type=int, default=4, help='每個 worker 的執行緒數')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--client-procs', type=int, default=max(1, min(4, cores // 2)))
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+
+    app_module = load_app()
+    with app_module.app.app_context():
+        form_id = app_module.create_form_record('load test', '', [])
+    app_module.discard_thread_connection()
+    workdir = os.getcwd()
+
+    baseline = None
+    print(f"{'workers':>8} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'scaling':>8}")
+    for workers in (int(n) for n in args.workers.split(',')):
+        env = dict(os.environ, WEB_WORKERS=str(workers), WEB_THREADS=str(args.threads),
+                   WEB_BIND=f'127.0.0.1:{args.port}', WEB_ACCESS_LOG='/dev/null')
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+            cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_for_port(args.port)
+            time.sleep(1.0)
+            samples, errors = run_load(args.port, form_id, args.concurrency, args.duration, args.client_procs)
+        finally:
+            server.terminate()
+            server.wait()
+
+        rps = len(samples) / args.duration
+        baseline = baseline or rps
+        print(f'{workers:>8} {rps:>10.1f} {percentile(samples, 50):>8.2f} {percentile(samples, 99):>8.2f}'
+              f' {errors:>7} {rps / baseline:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+gunicorn 設定：gunicorn -c gunicorn.conf.py wsgi:app
+
+每個參數都可以用環境變數覆寫，例如 WEB_WORKERS=4 WEB_THREADS=8。
+- 多個 worker 行程共用同一個 database.db：WAL 讓讀取不互相阻塞，寫入靠 busy timeout 排隊，
+  頁面快取的失效透過 page_cache_invalidations 資料表同步到其他 worker（最多延遲 PAGE_CACHE_SYNC_INTERVAL 秒）。
+- preload_app 讓 master 先完成資料庫遷移與樣板編譯，worker fork 後直接使用。
+- 平滑重啟：kill -HUP <master pid> 會逐一替換 worker；因為 preload_app，更新程式碼需要
+  kill -USR2 <master pid> 啟動新 master，確認正常後再對舊 master 送 WINCH 與 QUIT。
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('WEB_BIND', '127.0.0.1:5001')
+workers = int(os.environ.get('WEB_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 4))
+preload_app = True
+
+# keep-alive 讓同一頁的多個資源共用連線；放在 nginx 後面時應略大於 nginx 的 upstream keepalive_timeout
+keepalive = int(os.environ.get('WEB_KEEPALIVE', 5))
+timeout = int(os.environ.get('WEB_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+
+# 定期替換 worker，避免長時間執行造成的記憶體增長；jitter 避免所有 worker 同時重啟
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.environ.get('WEB_MAX_REQUESTS_JITTER', 500))
+
+# worker 心跳檔放在記憶體檔案系統，避免磁碟 I/O 忙碌時被誤判為無回應
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.environ.get('WEB_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """worker 行程內重新執行啟動流程：開啟自己的連線，必要時啟動提交日誌寫入器。"""
+    from app import create_app
+    create_app()
@@ -0,0 +1,166 @@
+// 後台公告表單的分段上傳：選好的檔案先以固定大小的分段送到 /admin_uploads，
+// 網路中斷時查詢伺服器已收到的位置再續傳；全部完成後表單只送出上傳 id。
+// 瀏覽器不支援或未載入本檔時，表單照舊以 multipart 直接上傳。
+(function () {
+  'use strict';
+
+  var MAX_RETRIES = 8;
+
+  function sleep(ms) {
+    return new Promise(function (resolve) { setTimeout(resolve, ms); });
+  }
+
+  function storageKey(file) {
+    return 'chunked-upload:' + [file.name, file.size, file.lastModified].join(':');
+  }
+
+  function request(method, url, body, headers) {
+    return fetch(url, {
+      method: method,
+      body: body,
+      headers: headers || {},
+      credentials: 'same-origin'
+    }).then(function (response) {
+      return response.json().catch(function () { return {}; }).then(function (data) {
+        data.httpStatus = response.status;
+        return data;
+      });
+    });
+  }
+
+  function startUpload(baseUrl, file) {
+    // 同一個檔案在重新整理頁面後沿用先前的上傳工作
+    var saved = localStorage.getItem(storageKey(file));
+    var resume = saved
+      ? request('GET', baseUrl + '/' + saved).then(function (status) {
+          return status.httpStatus === 200 ? status : null;
+        })
+      : Promise.resolve(null);
+    return resume.then(function (status) {
+      if (status) {
+        return status;
+      }
+      return request('POST', baseUrl, JSON.stringify({ filename: file.name, size: file.size }),
+        { 'Content-Type': 'application/json' }).then(function (created) {
+        if (created.httpStatus !== 201) {
+          throw new Error(created.error || '無法建立上傳');
+        }
+        localStorage.setItem(storageKey(file), created.upload_id);
+        return created;
+      });
+    });
+  }
+
+  function uploadFile(baseUrl, chunkSize, file, onProgress) {
+    return startUpload(baseUrl, file).then(function (status) {
+      var uploadId = status.upload_id;
+      var url = baseUrl + '/' + uploadId;
+      chunkSize = status.chunk_size || chunkSize;
+
+      function next(status, retries) {
+        onProgress(status.received / status.size);
+        if (status.complete) {
+          localStorage.removeItem(storageKey(file));
+          return uploadId;
+        }
+        var chunk = file.slice(status.received, status.received + chunkSize);
+        return request('PUT', url + '?offset=' + status.received, chunk,
+          { 'Content-Type': 'application/octet-stream' }).then(function (result) {
+          if (result.httpStatus === 200 || result.httpStatus === 409) {
+            // 409 代表伺服器的進度和本地不同，依回傳的 received 繼續
+            return next(result, 0);
+          }
+          throw new Error(result.error || '上傳失敗');
+        }, function () {
+          if (retries >= MAX_RETRIES) {
+            throw new Error('網路中斷，請稍後重新送出');
+          }
+          return sleep(Math.min(30000, 500 * Math.pow(2, retries))).then(function () {
+            return request('GET', url).then(function (latest) {
+              return next(latest.httpStatus === 200 ? latest : status, retries + 1);
+            }, function () {
+              return next(status, retries + 1);
+            });
+          });
+        });
+      }
+
+      return next(status, 0);
+    });
+  }
+
+  function addHidden(form, name, value) {
+    var input = document.createElement('input');
+    input.type = 'hidden';
+    input.name = name;
+    input.value = value;
+    input.setAttribute('data-chunked-upload', '');
+    form.appendChild(input);
+  }
+
+  function setup(form) {
+    var baseUrl = form.getAttribute('data-upload-url');
+    var chunkSize = parseInt(form.getAttribute('data-chunk-size'), 10);
+    var progress = form.querySelector('.upload-progress');
+    var submitting = false;
+    // 已上傳完成的檔案 -> 上傳 id；部分檔案失敗後重新送出時不再重傳這些檔案
+    var finished = new Map();
+
+    form.addEventListener('submit', function (event) {
+      if (submitting) {
+        return;
+      }
+      event.preventDefault();
+      // 上一次送出加上的 id 全部清掉，依這次選擇的檔案重新加入，避免同一個檔案出現兩次
+      form.querySelectorAll('input[data-chunked-upload]').forEach(function (input) {
+        input.parentNode.removeChild(input);
+      });
+      var jobs = [];
+      form.querySelectorAll('input[type=file][data-upload-field]').forEach(function (input) {
+        Array.prototype.forEach.call(input.files, function (file) {
+          jobs.push({ input: input, file: file, done: 0 });
+        });
+      });
+      var total = jobs.reduce(function (sum, job) { return sum + job.file.size; }, 0) || 1;
+      var button = form.querySelector('[type=submit]');
+      button.disabled = true;
+
+      function report() {
+        var sent = jobs.reduce(function (sum, job) { return sum + job.done * job.file.size; }, 0);
+        progress.textContent = '上傳中 ' + Math.floor(sent * 100 / total) + '%';
+      }
+
+      // 依序上傳，避免在慢速網路上同時開多條連線互相搶頻寬
+      jobs.reduce(function (chain, job) {
+        return chain.then(function () {
+          var upload = finished.has(job.file)
+            ? Promise.resolve(finished.get(job.file))
+            : uploadFile(baseUrl, chunkSize, job.file, function (ratio) {
+              job.done = ratio;
+              report();
+            });
+          return upload.then(function (uploadId) {
+            job.done = 1;
+            report();
+            finished.set(job.file, uploadId);
+            addHidden(form, job.input.getAttribute('data-upload-field'), uploadId);
+          });
+        });
+      }, Promise.resolve()).then(function () {
+        form.querySelectorAll('input[type=file][data-upload-field]').forEach(function (input) {
+          input.disabled = true;
+        });
+        submitting = true;
+        progress.textContent = '上傳完成，儲存中…';
+        form.submit();
+      }, function (error) {
+        progress.textContent = error.message + '（已上傳的部分會保留，重新送出即可續傳）';
+        button.disabled = false;
+      });
+    });
+  }
+
+  if (window.fetch && window.Promise && window.Map && window.Blob && Blob.prototype.slice) {
+    document.querySelectorAll('form[data-upload-url]').forEach(setup);
+  }
+})();
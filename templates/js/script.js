@@ -0,0 +1,13 @@
+// 前台共用腳本，由 flask build-assets 壓縮成 site.js（以 defer 載入）
+
+// QR Code 浮動框的關閉按鈕
+document.getElementById("close-btn").addEventListener("click", function () {
+  document.getElementById("floating-box").style.display = "none";
+});
+
+// 回到頂部
+document.getElementById("goTop").addEventListener("click", function (e) {
+  e.preventDefault();
+  document.documentElement.scrollTo({ top: 0, behavior: 'smooth' }); // html
+  document.body.scrollTo({ top: 0, behavior: 'smooth' });             // body
+});
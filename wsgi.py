@@ -0,0 +1,19 @@
+"""
+正式環境的 WSGI 進入點：gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import os
+
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from app import create_app, discard_thread_connection
+
+# preload_app 時這裡在 master 行程執行：提交日誌寫入器與遺留日誌的重播交給 post_fork 在各 worker 內啟動
+app = create_app(start_ingestor=False)
+# 放在 nginx 等反向代理後面時，request.remote_addr 一律是代理的位址；
+# 信任最靠近的 WEB_TRUSTED_PROXIES 層代理所加的 X-Forwarded-For / X-Forwarded-Proto，
+# /metrics 的來源限制與登入的 IP 限流才會看到真正的用戶端。直接對外提供服務時設為 0。
+trusted_proxies = int(os.environ.get('WEB_TRUSTED_PROXIES', 1))
+if trusted_proxies:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxies, x_proto=trusted_proxies)
+# master 行程在 fork 出 worker 之前不保留任何 SQLite 連線
+discard_thread_connection()